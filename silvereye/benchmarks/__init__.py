@@ -0,0 +1,28 @@
+"""
+Benchmarks for the Contracts Finder and simple CSV pipelines.
+
+Run a benchmark with Django settings configured, e.g.
+
+    DJANGO_SETTINGS_MODULE=cove_project.settings python -m silvereye.benchmarks.fix_contracts_finder
+"""
+import time
+
+import django
+
+
+def setup():
+    django.setup()
+
+
+def timed(func, *args, repeat=3, **kwargs):
+    """
+    Call func repeat times and return the last result and the best time in seconds
+    """
+    best = None
+    result = None
+    for i in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
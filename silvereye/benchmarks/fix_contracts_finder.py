@@ -0,0 +1,70 @@
+"""
+Compare fix_contracts_finder_flat_csv with the original row-wise implementation.
+
+Checks the output is identical on the bundled Contracts Finder samples, then
+times both on a sample scaled up to --rows rows.
+"""
+import argparse
+import os
+from os.path import join
+
+import pandas as pd
+
+from silvereye.benchmarks import setup, timed
+
+setup()
+
+import silvereye  # noqa: E402
+from silvereye.management.commands import get_cf_data  # noqa: E402
+
+SILVEREYE_DIR = silvereye.__path__[0]
+CF_SAMPLES = [
+    join(SILVEREYE_DIR, "data", "cf_daily_csv", "export-2020-08-05.csv"),
+    join(SILVEREYE_DIR, "tests", "fixtures", "CF_CSV", "export-2020-08-05.csv"),
+    join(SILVEREYE_DIR, "tests", "fixtures", "CF_CSV", "export-2020-08-05_single_buyer.csv"),
+]
+
+
+def fix_contracts_finder_flat_csv_rowwise(df):
+    """
+    The publisher/OCID rewriting as it was before vectorisation, for comparison.
+    Runs the current function first for the shared steps, so its timing includes them.
+    """
+    fixed_df = df.copy()
+    fixed_df = get_cf_data.fix_contracts_finder_flat_csv(fixed_df)
+    source_df = df[df.columns.intersection(fixed_df.columns)].rename(columns={'releases/0/tag/0': 'releases/0/tag'})
+    source_df = source_df.copy()
+    source_df['publisher/name'] = source_df['releases/0/buyer/name']
+    fixed_df['publisher/scheme'] = source_df.apply(lambda row: get_cf_data.set_scheme(row), axis=1)
+    fixed_df['publisher/uid'] = source_df.apply(lambda row: get_cf_data.set_uid(row), axis=1)
+    source_df['publisher/uid'] = fixed_df['publisher/uid']
+    fixed_df['publisher/uri'] = source_df.apply(lambda row: get_cf_data.set_uri(row), axis=1)
+    fixed_df['releases/0/ocid'] = source_df.apply(lambda row: get_cf_data.new_ocid_prefix(row), axis=1)
+    fixed_df['releases/0/id'] = source_df.apply(lambda row: row['releases/0/id'].replace('ocds-b5fd17-', ''), axis=1)
+    return fixed_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    for sample_path in CF_SAMPLES:
+        df = pd.read_csv(sample_path)
+        expected = fix_contracts_finder_flat_csv_rowwise(df)
+        actual = get_cf_data.fix_contracts_finder_flat_csv(df.copy())
+        pd.testing.assert_frame_equal(actual, expected)
+        print(f"identical output: {os.path.relpath(sample_path, SILVEREYE_DIR)} ({len(df)} rows)")
+
+    sample_df = pd.read_csv(CF_SAMPLES[0])
+    repeats = -(-args.rows // len(sample_df))
+    big_df = pd.concat([sample_df] * repeats, ignore_index=True).head(args.rows)
+
+    _, vectorised_time = timed(get_cf_data.fix_contracts_finder_flat_csv, big_df.copy(), repeat=3)
+    _, rowwise_time = timed(fix_contracts_finder_flat_csv_rowwise, big_df, repeat=1)
+    print(f"{len(big_df)} rows: row-wise {rowwise_time:.2f}s, vectorised {vectorised_time:.2f}s, "
+          f"speedup {rowwise_time / vectorised_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
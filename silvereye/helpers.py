@@ -16,8 +16,9 @@ from django.db.models.functions import Coalesce
 from django.utils.safestring import mark_safe
 
 import silvereye
-from silvereye.lib.converters import convert_csv
+from silvereye.lib.converters import convert_csv, convert_ocds_dataframe
 from silvereye.models import FileSubmission, FieldCoverage
+from silvereye.ocds_csv_mapper import CSVMapper
 
 logger = logging.getLogger(__name__)
 
@@ -338,10 +339,7 @@ def prepare_simple_csv_validation_errors(validation_errors, mapper, required_fie
     :return:
     """
 
-    mapping_dict = {}
-    for i, row in mapper.mappings_df.iterrows():
-        if row["csv_header"]:
-            mapping_dict[row["uri"]] = row["csv_header"]
+    mapping_dict = mapper.mappings.uri_to_header
 
     ocds_validation_errors = []
     simple_csv_errors = []
@@ -400,13 +398,34 @@ def prepare_simple_csv_validation_errors(validation_errors, mapper, required_fie
 
 def convert_simple_csv_submission(db_data, lib_cove_ocds_config, schema_url, file_type="csv", replace=True):
     # Silvereye CSV unflatten
-    # Prepare base_json
-    upload_dir = db_data.upload_dir()
-    upload_url = db_data.upload_url()
-    file_name = db_data.original_file.file.name
+    return convert_simple_csv_file(
+        db_data.upload_dir(),
+        db_data.upload_url(),
+        db_data.original_file.file.name,
+        db_data.publisher,
+        lib_cove_ocds_config,
+        schema_url,
+        file_type=file_type,
+        replace=replace,
+    )
+
 
+def convert_simple_csv_file(upload_dir, upload_url, file_name, publisher, lib_cove_ocds_config, schema_url,
+                            file_type="csv", replace=True):
+    """
+    Convert a simple CSV file into OCDS JSON in upload_dir, without touching the database,
+    so bulk loads can run the conversion before (or apart from) saving the FileSubmission
+
+    :param upload_dir: directory to write the conversion to, usually FileSubmission.upload_dir()
+    :param upload_url: URL of upload_dir
+    :param file_name: path to the simple CSV
+    :param publisher: Publisher, used for the package metadata (need not be saved)
+    :return: conversion context from convert_csv
+    """
+    # Prepare base_json
+    os.makedirs(upload_dir, exist_ok=True)
     base_json_path = os.path.join(upload_dir, "base.json")
-    prepare_simple_csv_submission_base_json(base_json_path, db_data.publisher)
+    prepare_simple_csv_submission_base_json(base_json_path, publisher)
     conversion_context = convert_csv(
         upload_dir,
         upload_url,
@@ -420,6 +439,36 @@ def convert_simple_csv_submission(db_data, lib_cove_ocds_config, schema_url, fil
     return conversion_context
 
 
+def convert_simple_csv_dataframe(upload_dir, upload_url, simple_csv_df, publisher, lib_cove_ocds_config, schema_url,
+                                 release_type=None):
+    """
+    In-memory version of convert_simple_csv_file for bulk loads: map the simple
+    CSV dataframe to OCDS headers without writing and re-reading it, and only
+    write the mapped CSV that flattentool reads.
+
+    :param upload_dir: directory to write the conversion to, usually FileSubmission.upload_dir()
+    :param upload_url: URL of upload_dir
+    :param simple_csv_df: dataframe of the simple CSV, as it would be read from the file
+    :param publisher: Publisher, used for the package metadata (need not be saved)
+    :param release_type: notice type, detected from the headers if not given
+    :return: conversion context from convert_ocds_dataframe
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    base_json_path = os.path.join(upload_dir, "base.json")
+    prepare_simple_csv_submission_base_json(base_json_path, publisher)
+    mapper = CSVMapper(release_type=release_type, input_df=simple_csv_df)
+    ocds_df = mapper.convert_simple_csv_df_to_ocds_df(simple_csv_df.copy())
+    conversion_context = convert_ocds_dataframe(
+        upload_dir,
+        upload_url,
+        ocds_df,
+        lib_cove_ocds_config,
+        schema_url=schema_url,
+        base_json_path=base_json_path
+    )
+    return conversion_context
+
+
 def prepare_simple_csv_submission_base_json(base_json_path, publisher):
     base_json = {
         "version": "1.1",
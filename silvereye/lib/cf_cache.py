@@ -0,0 +1,113 @@
+"""
+Parquet cache of preprocessed Contracts Finder daily frames.
+
+Each entry is the output of fix_contracts_finder_flat_csv for one daily CSV,
+stored under the hash of the source file and a version of the CF mappings, so
+a changed file or changed mappings never reuse a stale frame.
+"""
+import hashlib
+import logging
+import os
+
+import pandas as pd
+
+from silvereye.lib.cf_manifest import file_sha256
+
+try:
+    import pyarrow
+    import pyarrow.parquet  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+def mappings_version(mappings_file, preprocess_version):
+    """
+    Return a short version string for the preprocessing of CF data
+
+    :param mappings_file: path to contracts_finder_mappings.csv
+    :param preprocess_version: version of the preprocessing code, bumped when it changes the output
+    :return: hex string
+    """
+    sha256 = hashlib.sha256(str(preprocess_version).encode())
+    with open(mappings_file, "rb") as f:
+        sha256.update(f.read())
+    return sha256.hexdigest()[:16]
+
+
+class CFFrameCache:
+    """
+    Directory of Parquet files, one per preprocessed daily CSV.
+
+    Plain attributes only, so it can be passed to preprocessing worker processes.
+    """
+
+    def __init__(self, cache_dir, version):
+        self.cache_dir = cache_dir
+        self.version = version
+
+    @property
+    def available(self):
+        return pyarrow is not None
+
+    def path_for(self, sha256):
+        return os.path.join(self.cache_dir, f"{sha256}-{self.version}.parquet")
+
+    def key_for_file(self, source_file_path):
+        return file_sha256(source_file_path)
+
+    def get(self, sha256, columns=None, date_window=None):
+        """
+        Load a cached frame, reading only the columns and row groups needed
+
+        :param sha256: hash of the source file
+        :param columns: list of columns to read, or None for all
+        :param date_window: (start, end) tuple of UTC timestamps, to only read releases
+                            with start < publishedDate <= end
+        :return: dataframe, or None if it isn't cached
+        """
+        path = self.path_for(sha256)
+        if not self.available or not os.path.exists(path):
+            return None
+        filters = None
+        if date_window:
+            start, end = date_window
+            filters = [('publishedDate', '>', start.to_pydatetime()), ('publishedDate', '<=', end.to_pydatetime())]
+        try:
+            return pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+        except (pyarrow.ArrowException, OSError):
+            logger.warning("Ignoring unreadable cache file %s", path, exc_info=True)
+            return None
+
+    def put(self, sha256, df):
+        """
+        Store a frame, replacing any previous entry atomically
+
+        :param sha256: hash of the source file
+        :param df: preprocessed dataframe
+        """
+        if not self.available:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(sha256)
+        tmp_path = f"{path}.{os.getpid()}.part"
+        try:
+            df.to_parquet(tmp_path, engine="pyarrow", index=False)
+            os.replace(tmp_path, path)
+        except (pyarrow.ArrowException, ValueError, TypeError, OSError):
+            # e.g. an object column holding both numbers and strings
+            logger.warning("Could not cache preprocessed frame in %s", path, exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prune(self):
+        """
+        Remove entries written for other mappings versions
+        """
+        if not os.path.exists(self.cache_dir):
+            return
+        suffix = f"-{self.version}.parquet"
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".parquet") and not file_name.endswith(suffix):
+                os.remove(os.path.join(self.cache_dir, file_name))
@@ -0,0 +1,197 @@
+"""
+Concurrent downloader for the Contracts Finder Harvester daily CSV files
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+CF_HARVESTER_URL = "https://www.contractsfinder.service.gov.uk/Harvester/Notices/Data/CSV"
+DOWNLOAD_STATE_FILE = "download_state.json"
+
+DOWNLOADED = "downloaded"
+NOT_MODIFIED = "not_modified"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class DownloadSummary:
+    """
+    Counts and throughput for one run of the downloader
+    """
+
+    def __init__(self):
+        self.counts = {DOWNLOADED: 0, NOT_MODIFIED: 0, SKIPPED: 0, FAILED: 0}
+        self.bytes_downloaded = 0
+        self.elapsed = 0.0
+
+    def add(self, status, size=0):
+        self.counts[status] += 1
+        self.bytes_downloaded += size
+
+    @property
+    def megabytes_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.bytes_downloaded / self.elapsed / 1024 / 1024
+
+    def __str__(self):
+        return (
+            f"{self.counts[DOWNLOADED]} downloaded, {self.counts[NOT_MODIFIED]} not modified, "
+            f"{self.counts[SKIPPED]} skipped, {self.counts[FAILED]} failed; "
+            f"{self.bytes_downloaded / 1024 / 1024:.1f} MB in {self.elapsed:.1f}s "
+            f"({self.megabytes_per_second:.2f} MB/s)"
+        )
+
+
+class ContractsFinderDownloader:
+    """
+    Download one Harvester CSV per day using a bounded pool of worker threads.
+
+    Each file is streamed to a ``.part`` file which is renamed into place once
+    complete, so an interrupted run never leaves a truncated CSV behind. A
+    partial ``.part`` file left by a failed attempt is resumed with a Range
+    request. ETag/Last-Modified validators are kept in ``download_state.json``
+    in the source directory and sent back as conditional requests, and days
+    that had already ended when they were fetched are not requested again.
+    """
+
+    def __init__(self, source_dir, base_url=CF_HARVESTER_URL, workers=4, retries=3, backoff=1.0, timeout=60,
+                 chunk_size=1024 * 1024):
+        self.source_dir = source_dir
+        self.base_url = base_url.rstrip("/")
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.state_path = os.path.join(source_dir, DOWNLOAD_STATE_FILE)
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self):
+        tmp_path = self.state_path + ".part"
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _session(self):
+        # requests.Session is not guaranteed to be thread safe, so keep one per worker
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def url_for_date(self, date):
+        return f"{self.base_url}/{date.year}/{date.month:02}/{date.day:02}"
+
+    def path_for_date(self, date):
+        return os.path.join(self.source_dir, date.strftime("%Y%m%d") + ".csv")
+
+    def download_range(self, start_date, end_date):
+        """
+        Download the daily files for every day between start_date and end_date inclusive
+
+        :param start_date: First day to download. YYYY-MM-DD or datetime
+        :param end_date: Last day to download. YYYY-MM-DD or datetime
+        :return: DownloadSummary
+        """
+        os.makedirs(self.source_dir, exist_ok=True)
+        dates = pd.date_range(start_date, end_date)
+        summary = DownloadSummary()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for status, size in executor.map(self.fetch, dates):
+                summary.add(status, size)
+        summary.elapsed = time.monotonic() - started
+        self.save_state()
+        logger.info("Contracts Finder download: %s", summary)
+        return summary
+
+    def fetch(self, date):
+        """
+        Fetch the file for a single day, retrying with exponential backoff
+
+        :param date: Day to download
+        :return: tuple of (status, bytes downloaded)
+        """
+        url = self.url_for_date(date)
+        save_path = self.path_for_date(date)
+        key = os.path.basename(save_path)
+        entry = self.state.get(key, {})
+
+        if os.path.exists(save_path) and (entry.get("complete") or not entry):
+            return SKIPPED, 0
+
+        for attempt in range(self.retries + 1):
+            try:
+                return self._fetch_once(url, save_path, key, entry, date)
+            except (requests.RequestException, OSError):
+                if attempt == self.retries:
+                    logger.exception("Error downloading URL: %s", url)
+                    return FAILED, 0
+                delay = self.backoff * 2 ** attempt
+                logger.warning("Retrying %s in %.1fs", url, delay)
+                time.sleep(delay)
+
+    def _fetch_once(self, url, save_path, key, entry, date):
+        part_path = save_path + ".part"
+        headers = {}
+        resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if resume_from:
+            headers["Range"] = f"bytes={resume_from}-"
+        elif os.path.exists(save_path):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        logger.info("Downloading URL: %s", url)
+        with self._session().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                return NOT_MODIFIED, 0
+            if response.status_code == 416 and resume_from:
+                # The partial file already holds the whole body
+                size = 0
+            else:
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                if response.status_code not in (200, 206):
+                    logger.error("Error with URL: %s (HTTP %s)", url, response.status_code)
+                    return FAILED, 0
+                mode = "ab" if response.status_code == 206 else "wb"
+                size = 0
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(part_path, save_path)
+
+        fetched_at = datetime.utcnow()
+        with self._lock:
+            self.state[key] = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": fetched_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                # Files fetched after the day ended will not change again
+                "complete": date.date() < fetched_at.date(),
+            }
+        return DOWNLOADED, size
@@ -0,0 +1,113 @@
+"""
+Manifest of the Contracts Finder source files used by get_cf_data and the
+weekly outputs that were built from them, used for incremental runs.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class SourceManifest:
+    """
+    Persisted record of:
+        - sources: each daily file's size, sha256 hash, fetch time and the weeks its rows fell in
+        - periods: the source files and publisher partitions each week was built from
+    """
+
+    def __init__(self, path, download_state_path=None):
+        self.path = path
+        self.sources = {}
+        self.periods = {}
+        # Fetch times recorded by ContractsFinderDownloader
+        self.download_state = {}
+        if download_state_path and os.path.exists(download_state_path):
+            with open(download_state_path) as f:
+                self.download_state = json.load(f)
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.sources = data.get("sources", {})
+                self.periods = data.get("periods", {})
+            else:
+                logger.warning("Ignoring manifest %s with unknown version", path)
+
+    def save(self):
+        tmp_path = self.path + ".part"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "sources": self.sources, "periods": self.periods},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        self.sources = {}
+        self.periods = {}
+
+    def changed_sources(self, file_list):
+        """
+        Return the files in file_list that are new or whose contents have changed since they were last processed
+
+        :param file_list: paths of the daily CSVs
+        :return: dict of path to sha256 for the changed files
+        """
+        changed = {}
+        for path in file_list:
+            entry = self.sources.get(os.path.basename(path))
+            if entry and entry["size"] != os.path.getsize(path):
+                entry = None
+            sha256 = file_sha256(path)
+            if not entry or entry["sha256"] != sha256:
+                changed[path] = sha256
+        return changed
+
+    def periods_for_source(self, path):
+        entry = self.sources.get(os.path.basename(path), {})
+        return set(entry.get("periods", []))
+
+    def record_source(self, path, periods, fetched_at=None, sha256=None):
+        """
+        Record a processed daily file
+
+        :param path: path of the daily CSV
+        :param periods: names of the weeks the file's rows fell in
+        :param fetched_at: time the file was downloaded, if known
+        :param sha256: hash of the file, if already calculated
+        """
+        if fetched_at is None:
+            fetched_at = self.download_state.get(os.path.basename(path), {}).get("fetched_at")
+        if fetched_at is None:
+            fetched_at = datetime.utcfromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.sources[os.path.basename(path)] = {
+            "size": os.path.getsize(path),
+            "sha256": sha256 or file_sha256(path),
+            "fetched_at": fetched_at,
+            "periods": sorted(periods),
+        }
+
+    def record_period(self, period_name, sources, partitions):
+        """
+        Record a week that has been built
+
+        :param period_name: name of the week, e.g. 20200803-20200810
+        :param sources: paths of the daily CSVs that had rows in the week
+        :param partitions: names of the publisher (or 'all') partitions built for the week
+        """
+        self.periods[period_name] = {
+            "sources": sorted(os.path.basename(path) for path in sources),
+            "partitions": sorted(partitions),
+            "built_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
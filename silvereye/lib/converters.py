@@ -42,10 +42,6 @@ def convert_csv(
     base_json_path=None,
     output_file="unflattened.json",
 ):
-    context = {}
-    converted_path = os.path.join(upload_dir, "unflattened.json")
-    cell_source_map_path = os.path.join(upload_dir, "cell_source_map.json")
-    heading_source_map_path = os.path.join(upload_dir, "heading_source_map.json")
     encoding = "utf-8-sig"
 
     if file_type == "csv":
@@ -72,6 +68,81 @@ def convert_csv(
 
         # Convert Simple CSV to OCDS URIs
         df = silvereye.ocds_csv_mapper.CSVMapper(csv_path=destination).convert_simple_csv_to_ocds_csv(destination)
+    else:
+        input_name = file_name
+
+    return unflatten_converted_input(
+        upload_dir,
+        upload_url,
+        input_name,
+        file_type,
+        encoding,
+        lib_cove_config,
+        schema_url=schema_url,
+        replace=replace,
+        cache=cache,
+        base_json_path=base_json_path,
+        output_file=output_file,
+    )
+
+
+@cove_spreadsheet_conversion_error
+def convert_ocds_dataframe(
+    upload_dir,
+    upload_url,
+    ocds_df,
+    lib_cove_config,
+    schema_url=None,
+    replace=True,
+    cache=True,
+    base_json_path=None,
+    output_file="unflattened.json",
+):
+    """
+    Unflatten a dataframe that already has flattened OCDS release headers, e.g. from
+    CSVMapper.convert_simple_csv_df_to_ocds_df. flattentool reads from a directory of
+    CSVs, so the dataframe is written there once, as UTF-8.
+    """
+    input_name = os.path.join(upload_dir, "csv_dir")
+    os.makedirs(input_name, exist_ok=True)
+    destination = os.path.join(
+        input_name, lib_cove_config.config["root_list_path"] + ".csv"
+    )
+    with open(destination, "w", encoding="utf-8") as f:
+        ocds_df.to_csv(f, index=False, header=True)
+
+    return unflatten_converted_input(
+        upload_dir,
+        upload_url,
+        input_name,
+        "csv",
+        "utf-8-sig",
+        lib_cove_config,
+        schema_url=schema_url,
+        replace=replace,
+        cache=cache,
+        base_json_path=base_json_path,
+        output_file=output_file,
+    )
+
+
+def unflatten_converted_input(
+    upload_dir,
+    upload_url,
+    input_name,
+    file_type,
+    encoding,
+    lib_cove_config,
+    schema_url=None,
+    replace=True,
+    cache=True,
+    base_json_path=None,
+    output_file="unflattened.json",
+):
+    context = {}
+    converted_path = os.path.join(upload_dir, "unflattened.json")
+    cell_source_map_path = os.path.join(upload_dir, "cell_source_map.json")
+    heading_source_map_path = os.path.join(upload_dir, "heading_source_map.json")
 
     flattentool_options = {
         "output_name": converted_path,
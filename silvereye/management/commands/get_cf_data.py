@@ -3,33 +3,41 @@ Command to create an generate publisher metrics
 """
 import argparse
 import sys
+import uuid
 import zipfile
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from datetime import datetime, timedelta
 import json
 import logging
 import os
 from os.path import join
-import urllib.request
 import shutil
-from random import random
 
 import pandas as pd
 import numpy as np
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.files.base import ContentFile, File
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
 from django.template.defaultfilters import slugify
 from ocdskit.combine import combine_release_packages
 from flattentool import unflatten
 from pandas.errors import EmptyDataError
 
 import silvereye
+from cove.input.models import SuppliedData
 from bluetail.helpers import UpsertDataHelpers
 from libcoveocds.config import LibCoveOCDSConfig
-from silvereye.helpers import update_publisher_monthly_counts, sync_with_s3, convert_simple_csv_submission
-from silvereye.ocds_csv_mapper import CSVMapper
+from silvereye.helpers import update_publisher_monthly_counts, sync_with_s3, convert_simple_csv_dataframe
+from silvereye.lib.cf_cache import CFFrameCache, mappings_version
+from silvereye.lib.cf_download import ContractsFinderDownloader, CF_HARVESTER_URL, DOWNLOAD_STATE_FILE
+from silvereye.lib.cf_manifest import SourceManifest
+from silvereye.ocds_csv_mapper import CSVMapper, get_mapping_registry
 from silvereye.models import Publisher, FileSubmission, FieldCoverage
 
 logger = logging.getLogger('django')
@@ -41,8 +49,12 @@ WORKING_DIR = os.path.join(CF_DAILY_DIR, "working_files")
 SOURCE_DIR = os.path.join(WORKING_DIR, "source")
 CLEAN_OUTPUT_DIR = join(WORKING_DIR, "cleaned")
 SAMPLE_SUBMISSIONS_DIR = join(WORKING_DIR, "submissions")
+MANIFEST_PATH = join(WORKING_DIR, "manifest.json")
+CF_CACHE_DIR = join(WORKING_DIR, "cache")
 CF_MAPPINGS_FILE = os.path.join(SILVEREYE_DIR, "data", "csv_mappings", "contracts_finder_mappings.csv")
 OCDS_RELEASE_SCHEMA = join(SILVEREYE_DIR, "data", "OCDS", "1.1.4-release-schema.json")
+# Bump when fix_contracts_finder_flat_csv changes its output, to invalidate cached frames
+PREPROCESS_VERSION = 1
 
 cf_mapper = CSVMapper(mappings_file=CF_MAPPINGS_FILE)
 tender_mapper = CSVMapper(release_type="tender")
@@ -131,12 +143,39 @@ def new_ocid_prefix(row):
     """
     ocid = row['releases/0/ocid']
     ocid_prefix = get_ocid_prefix(ocid)
-    uid = create_uid(row)
-    new_ocid = [ord(char) - 96 for char in uid.replace('-', '')]
-    updated_ocid_prefix = 'ocds-' + ''.join(map(str, new_ocid))[0:6]
+    updated_ocid_prefix = ocid_prefix_for_uid(create_uid(row))
     return ocid.replace(ocid_prefix, updated_ocid_prefix, 1)
 
 
+def ocid_prefix_for_uid(uid):
+    """
+    Create a fake 11 character OCID prefix from a publisher uid
+
+    :param uid: slugified publisher name
+    :return: OCID prefix e.g. ocds-123456
+    """
+    new_ocid = [ord(char) - 96 for char in uid.replace('-', '')]
+    return 'ocds-' + ''.join(map(str, new_ocid))[0:6]
+
+
+def string_or_default(df, col, default):
+    """
+    Column-wise equivalent of using row.get(col) when it is a non-empty string, else a default
+
+    :param df: dataframe
+    :param col: name of the column to prefer
+    :param default: Series or scalar to use where the column is missing, empty or not a string
+    :return: Series
+    """
+    if isinstance(default, str):
+        default = pd.Series(default, index=df.index)
+    if col not in df.columns:
+        return default
+    values = df[col]
+    is_string = values.map(lambda value: isinstance(value, str) and value != "")
+    return values.where(is_string, default)
+
+
 def fix_contracts_finder_flat_csv(df):
     """
     Process raw CF CSV:
@@ -145,8 +184,7 @@ def fix_contracts_finder_flat_csv(df):
         - Use the first buyer name in the release as the publisher name and
           create example publisher attributes
     """
-    cf_mapper = CSVMapper(mappings_file=CF_MAPPINGS_FILE)
-    cols_list = cf_mapper.mappings_df["contracts_finder_daily_csv_path"].to_list()
+    cols_list = list(get_mapping_registry(CF_MAPPINGS_FILE).cf_paths)
     fixed_df = df[df.columns.intersection(cols_list)]
     fixed_df = fixed_df.rename(columns={
         'releases/0/tag/0': 'releases/0/tag'
@@ -157,11 +195,20 @@ def fix_contracts_finder_flat_csv(df):
     # fixed_df['publisher/scheme'] = fixed_df['releases/0/buyer/identifier/scheme']
     # fixed_df['publisher/uid'] = str(fixed_df['releases/0/buyer/identifier/id'])
     # fixed_df['publisher/scheme'] = "GB-OO"
-    fixed_df['publisher/scheme'] = fixed_df.apply(lambda row: set_scheme(row), axis=1)
-    fixed_df['publisher/uid'] = fixed_df.apply(lambda row: set_uid(row), axis=1)
-    fixed_df['publisher/uri'] = fixed_df.apply(lambda row: set_uri(row), axis=1)
-    fixed_df['releases/0/ocid'] = fixed_df.apply(lambda row: new_ocid_prefix(row), axis=1)
-    fixed_df['releases/0/id'] = fixed_df.apply(lambda row: row['releases/0/id'].replace('ocds-b5fd17-', ''), axis=1)
+    # These are column-wise versions of set_scheme, set_uid, set_uri and new_ocid_prefix,
+    # slugifying each publisher name once rather than once per row
+    publisher_names = fixed_df['publisher/name']
+    publisher_slugs = {name: slugify(name) for name in publisher_names.unique()}
+    slugs = publisher_names.map(publisher_slugs)
+    fixed_df['publisher/scheme'] = string_or_default(fixed_df, 'releases/0/buyer/identifier/scheme', "GB-OO")
+    fixed_df['publisher/uid'] = string_or_default(fixed_df, 'releases/0/buyer/identifier/id', slugs)
+    fixed_df['publisher/uri'] = string_or_default(fixed_df, 'releases/0/buyer/identifier/uri',
+                                                  "http://www.example.com/" + fixed_df['publisher/uid'])
+    ocid_prefixes = slugs.map({slug: ocid_prefix_for_uid(slug) for slug in publisher_slugs.values()})
+    # Everything after the first two "-" separated parts of the OCID, see get_ocid_prefix
+    ocid_suffixes = fixed_df['releases/0/ocid'].str.extract(r'(?s)^[^-]*(?:-[^-]*)?(.*)$', expand=False)
+    fixed_df['releases/0/ocid'] = ocid_prefixes + ocid_suffixes
+    fixed_df['releases/0/id'] = fixed_df['releases/0/id'].str.replace('ocds-b5fd17-', '', regex=False)
 
     # CF does not move info from tender section to award section, so we need to do this
     # Set award title/desc from tender as CF don't include it
@@ -329,7 +376,286 @@ def get_date_boundaries(start_date, end_date, df, days=7):
     return zip(starts, starts[1:])
 
 
-def process_contracts_finder_csv(publisher_names, start_date, end_date, options=None, file_path=None):
+def partition_cf_releases(df, date_boundaries, publisher_submissions=True):
+    """
+    Split preprocessed CF releases into weekly partitions, and into publisher
+    partitions within each week if publisher_submissions is set, in one pass.
+    Rows are bucketed with the same (start, end] boundaries as the weekly periods.
+
+    :param df: preprocessed CF dataframe
+    :param date_boundaries: list of (start, end) tuples from get_date_boundaries
+    :param publisher_submissions: Boolean to split each week by publisher
+    :return: dict of period index to a list of (partition name, dataframe) tuples
+    """
+    partitions = {}
+    if not date_boundaries or df.empty:
+        return partitions
+    edges = pd.DatetimeIndex([start for start, end in date_boundaries] + [date_boundaries[-1][1]])
+    period_codes = pd.cut(df['publishedDate'], bins=edges, labels=False)
+    if publisher_submissions:
+        for (period_code, publisher_name), partition_df in df.groupby([period_codes, df['publisher/name']], sort=False):
+            partitions.setdefault(int(period_code), []).append((slugify(publisher_name), partition_df))
+    else:
+        for period_code, partition_df in df.groupby(period_codes, sort=False):
+            partitions.setdefault(int(period_code), []).append(('all', partition_df))
+    return partitions
+
+
+def get_period_name(start, end):
+    return start.strftime("%Y%m%d") + "-" + end.strftime("%Y%m%d")
+
+
+def get_release_periods(df, date_boundaries):
+    """
+    Return the names of the weekly periods that the releases in a dataframe fall in
+
+    :param df: preprocessed CF dataframe
+    :param date_boundaries: list of (start, end) tuples from get_date_boundaries
+    :return: set of period names
+    """
+    if not date_boundaries or df.empty:
+        return set()
+    edges = pd.DatetimeIndex([start for start, end in date_boundaries] + [date_boundaries[-1][1]])
+    period_codes = pd.cut(df['publishedDate'], bins=edges, labels=False).dropna().unique()
+    return {get_period_name(*date_boundaries[int(period_code)]) for period_code in period_codes}
+
+
+def plan_incremental_run(manifest, file_list, date_boundaries, workers=1, cache=None):
+    """
+    Work out which weeks need to be rebuilt since the last run recorded in the
+    manifest, and preprocess only the daily files needed to rebuild them.
+
+    A week is rebuilt if it has not been built before, or if a daily file that
+    had (or now has) rows in it is new or has changed.
+
+    :param manifest: SourceManifest from the previous run
+    :param file_list: paths of the daily CSVs in the date range
+    :param date_boundaries: list of (start, end) tuples from get_date_boundaries
+    :param workers: number of processes to use for preprocessing
+    :param cache: CFFrameCache, or None to always parse the CSVs
+    :return: tuple of (OrderedDict of path to preprocessed dataframe, set of period names to rebuild,
+             dict of path to sha256 for the changed files)
+    """
+    period_names = {get_period_name(start, end) for start, end in date_boundaries}
+    changed = manifest.changed_sources(file_list)
+    date_window = get_date_window(date_boundaries)
+    source_data = preprocess_cf_files([path for path in file_list if path in changed], workers=workers, cache=cache,
+                                      date_window=date_window)
+
+    rebuild_periods = {period_name for period_name in period_names
+                       if period_name not in manifest.periods or not os.path.exists(join(CLEAN_OUTPUT_DIR, period_name))}
+    for source_file_path in changed:
+        rebuild_periods |= manifest.periods_for_source(source_file_path)
+        if source_file_path in source_data:
+            rebuild_periods |= get_release_periods(source_data[source_file_path], date_boundaries)
+    rebuild_periods &= period_names
+
+    # Unchanged files are still needed if they have rows in a week being rebuilt
+    unchanged = [path for path in file_list
+                 if path not in changed and manifest.periods_for_source(path) & rebuild_periods]
+    source_data.update(preprocess_cf_files(unchanged, workers=workers, cache=cache, date_window=date_window))
+    source_data = OrderedDict((path, source_data[path]) for path in file_list if path in source_data)
+    logger.info("Incremental run: %s changed files, rebuilding %s weeks from %s files",
+                len(changed), len(rebuild_periods), len(source_data))
+    return source_data, rebuild_periods, changed
+
+
+def remove_period_outputs(period_name):
+    """
+    Delete the output files previously created for a weekly period
+
+    :param period_name: name of the week, e.g. 20200803-20200810
+    """
+    shutil.rmtree(join(CLEAN_OUTPUT_DIR, period_name), ignore_errors=True)
+    if os.path.exists(SAMPLE_SUBMISSIONS_DIR):
+        for file_name in os.listdir(SAMPLE_SUBMISSIONS_DIR):
+            if file_name.endswith(f"_{period_name}.csv"):
+                os.remove(join(SAMPLE_SUBMISSIONS_DIR, file_name))
+
+
+def get_cf_frame_cache():
+    """
+    Return the Parquet cache of preprocessed daily frames, or None if pyarrow isn't installed
+    """
+    cache = CFFrameCache(CF_CACHE_DIR, mappings_version(CF_MAPPINGS_FILE, PREPROCESS_VERSION))
+    if not cache.available:
+        logger.info("pyarrow is not installed, preprocessed Contracts Finder data will not be cached")
+        return None
+    return cache
+
+
+def get_date_window(date_boundaries):
+    """
+    Return the (start, end) of the whole period covered by the weekly date boundaries
+    """
+    if not date_boundaries:
+        return None
+    return date_boundaries[0][0], date_boundaries[-1][1]
+
+
+def preprocess_cf_file(source_file_path, cache=None, date_window=None):
+    """
+    Read and preprocess a single Contracts Finder daily CSV.
+    Module level so it can be run in a process pool.
+
+    If a cache is given, the preprocessed frame is loaded from it when the file
+    has been seen before, otherwise it is stored there after preprocessing.
+
+    :param source_file_path: path to the daily CSV
+    :param cache: CFFrameCache, or None to always parse the CSV
+    :param date_window: (start, end) tuple to only keep releases with start < publishedDate <= end
+    :return: preprocessed dataframe, or None if the file is empty or can't be processed
+    """
+    try:
+        fixed_df = None
+        if cache is not None:
+            cache_key = cache.key_for_file(source_file_path)
+            fixed_df = cache.get(cache_key, date_window=date_window)
+            if fixed_df is not None:
+                logger.info("Loaded preprocessed %s from cache", source_file_path)
+        if fixed_df is None:
+            logger.info("Preprocessing %s", source_file_path)
+            df = pd.read_csv(source_file_path, escapechar='\\')
+            fixed_df = fix_contracts_finder_flat_csv(df)
+            fixed_df['publishedDate'] = pd.to_datetime(fixed_df['publishedDate'])
+            if cache is not None:
+                # Cache the whole file, the date window may differ next time
+                cache.put(cache_key, fixed_df)
+            if date_window:
+                start, end = date_window
+                fixed_df = fixed_df[(fixed_df['publishedDate'] > start) & (fixed_df['publishedDate'] <= end)]
+        return fixed_df.reset_index(drop=True).replace({np.nan: None})
+    except pd.errors.EmptyDataError:
+        return None
+    except ValueError:
+        logger.exception("error preprocessing %s", source_file_path)
+        return None
+
+
+def preprocess_cf_files(file_list, workers=1, cache=None, date_window=None):
+    """
+    Preprocess a list of Contracts Finder daily CSVs, optionally in a process pool
+
+    :param file_list: paths of the daily CSVs
+    :param workers: number of processes to use
+    :param cache: CFFrameCache, or None to always parse the CSVs
+    :param date_window: (start, end) tuple to only keep releases with start < publishedDate <= end
+    :return: OrderedDict of path to preprocessed dataframe, in the same order as file_list
+    """
+    preprocess = partial(preprocess_cf_file, cache=cache, date_window=date_window)
+    if workers > 1 and len(file_list) > 1:
+        logger.info("Preprocessing %s files with %s workers", len(file_list), workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields in file_list order, so the merged frame is the same as a serial run
+            results = list(executor.map(preprocess, file_list))
+    else:
+        results = [preprocess(source_file_path) for source_file_path in file_list]
+    return OrderedDict(
+        (source_file_path, fixed_df) for source_file_path, fixed_df in zip(file_list, results) if fixed_df is not None
+    )
+
+
+def spill_cf_file(source_file_path, publisher_names, date_boundaries, spill_dir, publisher_submissions=True,
+                  chunksize=10000):
+    """
+    Read a Contracts Finder daily CSV in chunks and append the rows for each
+    week and publisher to spill files, so only one chunk is held in memory.
+
+    Each chunk is written as its own part file under
+    spill_dir/<period>/<publisher slug or 'all'>/, named so that sorting the
+    part files gives the original file and row order.
+
+    :param source_file_path: path to the daily CSV
+    :param publisher_names: List of names of publishers to keep, or None to keep all
+    :param date_boundaries: list of (start, end) tuples from get_date_boundaries
+    :param spill_dir: directory to write the spill files to
+    :param publisher_submissions: Boolean to split each week by publisher
+    :param chunksize: number of rows to read at a time
+    """
+    file_name = os.path.splitext(os.path.basename(source_file_path))[0]
+    logger.info("Preprocessing %s in chunks of %s rows", source_file_path, chunksize)
+    try:
+        reader = pd.read_csv(source_file_path, escapechar='\\', chunksize=chunksize)
+        for chunk_number, chunk in enumerate(reader):
+            # Filter early, publisher/name is copied from the buyer name
+            if publisher_names:
+                chunk = chunk[chunk['releases/0/buyer/name'].isin(publisher_names)]
+            if chunk.empty:
+                continue
+            fixed_df = fix_contracts_finder_flat_csv(chunk)
+            fixed_df = fixed_df.replace({np.nan: None})
+            fixed_df['publishedDate'] = pd.to_datetime(fixed_df['publishedDate'])
+            partitions = partition_cf_releases(fixed_df, date_boundaries, publisher_submissions)
+            for period_index, period_partitions in partitions.items():
+                period_name = get_period_name(*date_boundaries[period_index])
+                for partition_name, partition_df in period_partitions:
+                    partition_dir = join(spill_dir, period_name, partition_name)
+                    os.makedirs(partition_dir, exist_ok=True)
+                    part_path = join(partition_dir, f"{file_name}-{chunk_number:06}.csv")
+                    partition_df.to_csv(part_path, index=False, header=True)
+    except pd.errors.EmptyDataError:
+        pass
+    except ValueError:
+        logger.exception("error preprocessing %s", source_file_path)
+
+
+def read_spilled_partition(partition_dir):
+    """
+    Read the part files for one week/publisher back into a single dataframe
+
+    :param partition_dir: directory of part files written by spill_cf_file
+    :return: dataframe in the same form as the output of preprocess_cf_file
+    """
+    # Read as text so values are written out again exactly as they were spilled
+    parts = [pd.read_csv(join(partition_dir, part_name), dtype=str)
+             for part_name in sorted(os.listdir(partition_dir))]
+    df = pd.concat(parts, ignore_index=True, sort=False)
+    df = df.replace({np.nan: None})
+    df['publishedDate'] = pd.to_datetime(df['publishedDate'])
+    return df
+
+
+def process_contracts_finder_csv_chunked(file_list, publisher_names, start_date, end_date, options):
+    """
+    Bounded memory version of process_contracts_finder_csv.
+    Rows are routed into per week/publisher spill files as each file is read
+    in chunks, and then each spilled partition is read back and turned into
+    output files in turn. Peak memory depends on the chunk size and the
+    largest single partition, not on the date range.
+
+    :param file_list: paths of the daily CSVs
+    :param publisher_names: List of names of publishers to preprocess
+    :param start_date: first date on which data might appear
+    :param end_date: last date on which data might appear
+    :param options: Dictionary of options
+    """
+    publisher_submissions = options['publisher_submissions']
+    date_boundaries = list(get_date_boundaries(start_date, end_date, None))
+    spill_dir = join(WORKING_DIR, "spill")
+    remake_dir(spill_dir)
+
+    for source_file_path in file_list:
+        spill_cf_file(source_file_path, publisher_names, date_boundaries, spill_dir,
+                      publisher_submissions=publisher_submissions, chunksize=options['chunksize'])
+
+    partitions = []
+    for start, end in date_boundaries:
+        period_name = get_period_name(start, end)
+        period_dir = join(CLEAN_OUTPUT_DIR, period_name)
+        os.makedirs(period_dir)
+        period_spill_dir = join(spill_dir, period_name)
+        if not os.path.exists(period_spill_dir):
+            continue
+        for partition_name in sorted(os.listdir(period_spill_dir)):
+            partitions.append((join(period_spill_dir, partition_name), partition_name, period_dir,
+                               options['load_data'], options.get('spend_seed')))
+    create_partition_output_files(build_spilled_output_files, partitions, options['load_data'],
+                                  workers=options.get('workers') or 1)
+
+    shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def process_contracts_finder_csv(publisher_names, start_date, end_date, options=None, file_path=None, manifest=None):
     """
     Load Contracts Finder API flat CSV output from the source directory,
     pre-process it and turn it into JSON. Group the data into publisher
@@ -341,12 +667,13 @@ def process_contracts_finder_csv(publisher_names, start_date, end_date, options=
     :param end_date: last date on which data might appear
     :param options: Dictionary of options
     :param file_path: path to file to insert
+    :param manifest: SourceManifest to record the sources and outputs in, and to plan incremental runs from
     """
     if options is None:
         options = {}
     publisher_submissions = options['publisher_submissions']
     load_data = options['load_data']
-    source_data = []
+    spend_seed = options.get('spend_seed')
     file_list = []
 
     # Prepare list of CSVs to process
@@ -362,21 +689,34 @@ def process_contracts_finder_csv(publisher_names, start_date, end_date, options=
                     file_list.append(source_file_path)
                     file_list.sort()
 
-    # Preprocess and merge all the CSV files into one dataframe
-    for source_file_path in file_list:
-        try:
-            logger.info("Preprocessing %s", source_file_path)
-            df = pd.read_csv(source_file_path, escapechar='\\')
-            fixed_df = fix_contracts_finder_flat_csv(df)
-            fixed_df = fixed_df.replace({np.nan: None})
-            fixed_df['publishedDate'] = pd.to_datetime(fixed_df['publishedDate'])
-            source_data.append(fixed_df)
-        except pd.errors.EmptyDataError:
-            pass
-        except ValueError:
-            logger.exception("error preprocessing %s", source_file_path)
+    if options.get('chunksize') and start_date:
+        process_contracts_finder_csv_chunked(file_list, publisher_names, start_date, end_date, options)
+        if manifest is not None:
+            # Chunked runs don't record their sources, so the next incremental run rebuilds everything
+            manifest.reset()
+        return
 
-    source_df = pd.concat(source_data, ignore_index=True)
+    workers = options.get('workers') or 1
+    cache = get_cf_frame_cache() if options.get('cache', True) else None
+    if cache is not None:
+        cache.prune()
+    date_boundaries = list(get_date_boundaries(start_date, end_date, None)) if start_date else []
+    rebuild_periods = {get_period_name(start, end) for start, end in date_boundaries}
+    changed = {}
+
+    # Preprocess and merge all the CSV files into one dataframe
+    if manifest is not None and options.get('incremental') and start_date:
+        source_data, rebuild_periods, changed = plan_incremental_run(manifest, file_list, date_boundaries, workers,
+                                                                     cache=cache)
+        if not rebuild_periods:
+            logger.info("No Contracts Finder data has changed since the last run")
+            return
+    else:
+        source_data = preprocess_cf_files(file_list, workers=workers, cache=cache,
+                                          date_window=get_date_window(date_boundaries))
+        if manifest is not None:
+            manifest.reset()
+    source_df = pd.concat(list(source_data.values()), ignore_index=True)
 
     # Used to create CF mappings
     # source_combined_path = os.path.join(WORKING_DIR, "combined.csv")
@@ -390,72 +730,107 @@ def process_contracts_finder_csv(publisher_names, start_date, end_date, options=
 
     if not start_date:
         file_name = os.path.basename(file_path)
-        create_output_files(file_name, source_df, CLEAN_OUTPUT_DIR, load_data)
+        create_output_files(file_name, source_df, CLEAN_OUTPUT_DIR, load_data, spend_seed=spend_seed)
         return
 
-    # Get the date boundaries to use for package files
-    date_boundaries = get_date_boundaries(start_date, end_date, source_df)
-
-    # Filter the data according to those boundaries
-    for start, end in date_boundaries:
-        period_dir = join(CLEAN_OUTPUT_DIR, start.strftime("%Y%m%d") + "-" + end.strftime("%Y%m%d"))
+    source_periods = {path: get_release_periods(df, date_boundaries) for path, df in source_data.items()}
+
+    # Split the data by the weekly boundaries, and by publisher if grouping by
+    # publisher, otherwise create a combined file per period
+    partitions = partition_cf_releases(source_df, date_boundaries, publisher_submissions)
+    output_partitions = []
+    for period_index, (start, end) in enumerate(date_boundaries):
+        period_name = get_period_name(start, end)
+        if period_name not in rebuild_periods:
+            continue
+        remove_period_outputs(period_name)
+        period_dir = join(CLEAN_OUTPUT_DIR, period_name)
         os.makedirs(period_dir)
-        boundary_mask = (source_df['publishedDate'] > start) & (source_df['publishedDate'] <= end)
-        period_df = source_df.loc[boundary_mask]
-
-        # If grouping by publisher, create the output files per publisher,
-        # otherwise create a combined file
-        if publisher_submissions:
-            for publisher_name in period_df['publisher/name'].unique():
-                publisher_df = period_df[period_df['publisher/name'] == publisher_name]
-                directory_name = slugify(publisher_name)
-                create_output_files(directory_name, publisher_df, period_dir, load_data)
-        else:
-            create_output_files('all', period_df, period_dir, load_data)
+        period_partitions = partitions.get(period_index, [])
+        for directory_name, partition_df in period_partitions:
+            output_partitions.append((directory_name, partition_df, period_dir, load_data, spend_seed))
+        if manifest is not None:
+            manifest.record_period(
+                period_name,
+                sources=[path for path, periods in source_periods.items() if period_name in periods],
+                partitions=[directory_name for directory_name, partition_df in period_partitions],
+            )
 
+    create_partition_output_files(build_output_files, output_partitions, load_data, workers=workers)
 
-# Augment award with transaction
-def augment_award_row_with_spend(row):
+    if manifest is not None:
+        for source_file_path, periods in source_periods.items():
+            manifest.record_source(source_file_path, periods, sha256=changed.get(source_file_path))
+
+
+def spend_uri(uri):
     """
-    Take a row of CF dataframe and append columns with fake spend data generated from the award fields
+    Create a fake Contracts Finder notice uri for spend generated from an award notice
 
-    :param row: Row of CF dataframe
-    :return: Row of CF dataframe with new columns for transactions
+    :param uri: uri of the award notice
+    :return: uri for the spend notice
     """
-    row["releases/0/tag"] = "implementation"
+    contracts_finder_id = os.path.splitext(os.path.split(uri)[1])[0]
+    spend_contracts_finder_id = contracts_finder_id[:-4] + "1234"
+    return uri.replace(contracts_finder_id, spend_contracts_finder_id)
+
+
+def spend_rng(seed, *keys):
+    """
+    Create a NumPy random generator for synthesising spend for one partition.
+    The keys (e.g. publisher and period names) are mixed into the seed so each
+    partition gets the same data however many partitions are run, and in any order.
+
+    :param seed: integer seed, or None for unseeded random data
+    :param keys: strings identifying the partition
+    :return: numpy.random.Generator
+    """
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng([seed] + [zlib.crc32(key.encode("utf-8")) for key in keys])
+
+
+def synthesise_spend(award_df, rng):
+    """
+    Take a CF dataframe of awards and return a dataframe of fake spend releases generated from the award fields
+
+    :param award_df: CF dataframe of award releases
+    :param rng: numpy.random.Generator used for the publishing and transaction date offsets
+    :return: CF dataframe with columns for transactions
+    """
+    date_format = '%Y-%m-%dT%H:%M:%SZ'
+    spend_df = award_df.copy()
+    spend_df["releases/0/tag"] = "implementation"
     # Change IDs
-    row["releases/0/ocid"] += "_trans1"
-    row["releases/0/id"] += "_trans1"
-    # Set published date some time later than award
-    days_between_publishing_award_and_spend = int(random() * 10) + 10
-    award_pub_datetime = datetime.strptime(row["releases/0/date"], '%Y-%m-%dT%H:%M:%SZ')
-    trans_pub_datetime = datetime.strftime(
-        award_pub_datetime + relativedelta(days=days_between_publishing_award_and_spend), '%Y-%m-%dT%H:%M:%SZ')
-    row["releases/0/date"] = trans_pub_datetime
-    row["publishedDate"] = trans_pub_datetime
-    # Set Transaction date
-    days_between_awarded_date_and_trans_date = int(random() * 10) + 10
-    awarded_datetime = datetime.strptime(row["releases/0/awards/0/date"], '%Y-%m-%dT%H:%M:%SZ')
-    trans_datetime = datetime.strftime(awarded_datetime + relativedelta(days=days_between_awarded_date_and_trans_date),
-                                       '%Y-%m-%dT%H:%M:%SZ')
-    row["releases/0/contracts/0/implementation/transactions/0/date"] = trans_datetime
+    spend_df["releases/0/ocid"] = spend_df["releases/0/ocid"] + "_trans1"
+    spend_df["releases/0/id"] = spend_df["releases/0/id"] + "_trans1"
+    # Set published date 10-19 days later than award
+    days_between_publishing_award_and_spend = pd.to_timedelta(rng.integers(10, 20, size=len(spend_df)), unit="D")
+    award_pub_datetime = pd.to_datetime(spend_df["releases/0/date"], format=date_format)
+    trans_pub_datetime = (award_pub_datetime + days_between_publishing_award_and_spend).dt.strftime(date_format)
+    spend_df["releases/0/date"] = trans_pub_datetime
+    spend_df["publishedDate"] = trans_pub_datetime
+    # Set Transaction date 10-19 days after the award date
+    days_between_awarded_date_and_trans_date = pd.to_timedelta(rng.integers(10, 20, size=len(spend_df)), unit="D")
+    awarded_datetime = pd.to_datetime(spend_df["releases/0/awards/0/date"], format=date_format)
+    spend_df["releases/0/contracts/0/implementation/transactions/0/date"] = \
+        (awarded_datetime + days_between_awarded_date_and_trans_date).dt.strftime(date_format)
     # Copy award value to transaction
-    row["releases/0/contracts/0/implementation/transactions/0/value/amount"] = row["releases/0/awards/0/value/amount"]
-    row["releases/0/contracts/0/implementation/transactions/0/value/currency"] = row["releases/0/awards/0/value/currency"]
+    spend_df["releases/0/contracts/0/implementation/transactions/0/value/amount"] = \
+        spend_df["releases/0/awards/0/value/amount"]
+    spend_df["releases/0/contracts/0/implementation/transactions/0/value/currency"] = \
+        spend_df["releases/0/awards/0/value/currency"]
     # Copy items to contract
-    for col, value in row.items():
+    for col in award_df.columns:
         if "tender/items" in col:
-            row[col.replace("releases/0/tender/", "releases/0/contracts/0/")] = row[col]
+            spend_df[col.replace("releases/0/tender/", "releases/0/contracts/0/")] = spend_df[col]
 
-    uri = row["uri"]
-    contracts_finder_id = os.path.splitext(os.path.split(uri)[1])[0]
-    spend_contracts_finder_id = contracts_finder_id[:-4] + "1234"
-    row["uri"] = row["uri"].replace(contracts_finder_id, spend_contracts_finder_id)
+    spend_df["uri"] = spend_df["uri"].map(spend_uri)
 
-    return row
+    return spend_df
 
 
-def create_output_files(name, df, parent_directory, load_data, unflatten_contracts_finder_data=False):
+def create_output_files(name, df, parent_directory, load_data, unflatten_contracts_finder_data=False, spend_seed=None):
     """
     Create a set of JSON format release package files from the DataFrame
     supplied for the releases where the type is tender or award. Load the data
@@ -466,11 +841,34 @@ def create_output_files(name, df, parent_directory, load_data, unflatten_contrac
     :param parent_directory: Path to the parent directory to create the files
     :param load_data: Boolean indicating that the data should be loaded
     :param unflatten_contracts_finder_data: Run legacy unflattening of raw CF data (used for dev/debugging)
+    :param spend_seed: Seed for the fake spend data, or None for unseeded random data
+    """
+    output_files = build_output_files(name, df, parent_directory, load_data, spend_seed=spend_seed)
+    load_output_files(output_files, load_data, unflatten_contracts_finder_data=unflatten_contracts_finder_data)
+
+
+def build_output_files(name, df, parent_directory, load_data, spend_seed=None):
+    """
+    Write the output CSVs and simple CSV submissions for one week/publisher
+    partition and, if the data is to be loaded, convert the submissions to OCDS
+    JSON. Nothing is written to the database, so partitions can be built in
+    parallel worker processes and loaded afterwards with load_output_files.
+
+    :param name: Name of the directory to create
+    :param df: DataFrame containing the data
+    :param parent_directory: Path to the parent directory to create the files
+    :param load_data: Boolean indicating that the data should be loaded
+    :param spend_seed: Seed for the fake spend data, or None for unseeded random data
+    :return: list of dicts describing each simple CSV submission created
     """
     release_types = ['tender',
                      'award',
                      'spend'
                      ]
+    output_files = []
+    # Split by release tag once rather than filtering for each release type
+    release_type_dfs = dict(tuple(df.groupby('releases/0/tag', sort=False)))
+    empty_df = df.iloc[0:0]
     for release_type in release_types:
         logger.debug("Creating output files for %s %s", name, release_type)
 
@@ -482,16 +880,13 @@ def create_output_files(name, df, parent_directory, load_data, unflatten_contrac
         # Filter the DataFrame
         if release_type == "spend":
             # Use award data and add fake spend
-            df_release_type = df[df['releases/0/tag'] == "award"]
-            spend_df = pd.DataFrame()
-            for i, row in df_release_type.iterrows():
-                rowdf = df_release_type.loc[[i]]
-                new_row_df = rowdf.apply(augment_award_row_with_spend, axis=1)
-                spend_df = spend_df.append(new_row_df)
+            df_release_type = release_type_dfs.get("award", empty_df)
             if not df_release_type.empty:
+                rng = spend_rng(spend_seed, os.path.basename(parent_directory), name)
+                spend_df = synthesise_spend(df_release_type, rng)
                 df_release_type = spend_df.loc[spend_df["publishedDate"] < str(datetime.now())]
         else:
-            df_release_type = df[df['releases/0/tag'] == release_type]
+            df_release_type = release_type_dfs.get(release_type, empty_df)
 
         if df_release_type.shape[0] > 0:
             csv_file_name = release_name + ".csv"
@@ -517,87 +912,174 @@ def create_output_files(name, df, parent_directory, load_data, unflatten_contrac
             simple_csv_df = ocds_mapper.output_simple_csv(ocds_1_1_release_df)
             simple_csv_df.to_csv(open(simple_csv_file_path, "w"), index=False, header=True)
 
-            # Upload simple CSV to DB
+            output_file = {
+                "name": name,
+                "parent_directory": parent_directory,
+                "output_dir": output_dir,
+                "json_file_path": json_file_path,
+                "last_published_date": last_published_date,
+                "notice_type": ocds_mapper.release_type,
+                "simple_csv_file_name": simple_csv_file_name,
+                "simple_csv_file_path": simple_csv_file_path,
+            }
             if load_data:
-                try:
-                    publisher_name = df_release_type.iloc[0]["publisher/name"]
-                    publisher_scheme = df_release_type.iloc[0]["publisher/scheme"]
-                    publisher_id = df_release_type.iloc[0]["publisher/uid"]
-                    publisher_uri = df_release_type.iloc[0]["publisher/uri"]
-                    ocid_prefix = get_ocid_prefix(df_release_type.iloc[0]["releases/0/ocid"])
-
-                    # helpers.SimpleSubmissionHelpers().load_simple_csv_into_database(simple_csv_df, publisher)
-                    # Load data from Simple CSV
-                    logger.debug("Creating or updating Publisher %s (id %s)", publisher_name, publisher_id)
-                    contact_name = df_release_type.iloc[0]["releases/0/buyer/contactPoint/name"]
-                    contact_email = df_release_type.iloc[0]["releases/0/buyer/contactPoint/email"]
-                    contact_telephone = df_release_type.iloc[0]["releases/0/buyer/contactPoint/telephone"]
-
-                    publisher, created = Publisher.objects.update_or_create(
-                        publisher_name=publisher_name,
-                        defaults={
-                            "publisher_name": publisher_name,
-                            "publisher_id": publisher_id,
-                            "publisher_scheme": publisher_scheme,
-                            "uri": publisher_uri,
-                            "ocid_prefix": ocid_prefix,
-                            "contact_name": contact_name if contact_name else "",
-                            "contact_email": contact_email if contact_email else "",
-                            "contact_telephone": contact_telephone if contact_telephone else "",
-                        }
-                    )
-
-                    published_date = df_release_type.iloc[0]["publishedDate"]
-
-                    uri = df_release_type.iloc[0]["uri"]
-                    contracts_finder_id = os.path.splitext(os.path.split(uri)[1])[0]
-
-                    logger.info("Creating FileSubmission %s uri %s date %s", publisher.publisher_name, contracts_finder_id, published_date)
-                    # Create FileSubmission entry
-                    supplied_data, created = FileSubmission.objects.update_or_create(
-                        id=contracts_finder_id,
-                        defaults={
-                            "current_app": "silvereye",
-                            "notice_type": ocds_mapper.release_type,
-                        }
-                    )
-                    supplied_data.publisher = publisher
-                    supplied_data.created = published_date
-                    if supplied_data.original_file and os.path.exists(supplied_data.original_file.path):
-                        os.remove(supplied_data.original_file.path)
-                    supplied_data.original_file.save(simple_csv_file_name, File(open(simple_csv_file_path)))
-                    supplied_data.save()
-
-                    if settings.STORE_OCDS_IN_S3:
-                        sync_with_s3(supplied_data)
-
-                    # Store field coverage
-                    simple_csv_mapper = CSVMapper(csv_path=simple_csv_file_path)
-                    coverage_context = simple_csv_mapper.get_coverage_context()
-                    average_field_completion = coverage_context.get("average_field_completion")
-                    FieldCoverage.objects.update_or_create(
-                        file_submission=supplied_data,
-                        defaults={
-                            "tenders_field_coverage": average_field_completion if simple_csv_mapper.release_type == "tender" else None,
-                            "awards_field_coverage": average_field_completion if simple_csv_mapper.release_type == "award" else None,
-                            "spend_field_coverage": average_field_completion if simple_csv_mapper.release_type == "spend" else None,
-                        }
-                    )
-
-                    lib_cove_ocds_config = LibCoveOCDSConfig()
-
-                    conversion_context = convert_simple_csv_submission(
-                        supplied_data,
-                        lib_cove_ocds_config,
-                        OCDS_RELEASE_SCHEMA
-                    )
-                    converted_path = conversion_context.get("converted_path")
-                    UpsertDataHelpers().upsert_ocds_data(converted_path, supplied_data)
-                except FileNotFoundError:
-                    logger.exception("Error loading data for %s in %s", name, parent_directory)
-
-            if unflatten_contracts_finder_data:
-                unflatten_cf_data(json_file_path, last_published_date, load_data, output_dir)
+                first_release = df_release_type.iloc[0]
+                uri = first_release["uri"]
+                output_file.update({
+                    "contracts_finder_id": os.path.splitext(os.path.split(uri)[1])[0],
+                    "published_date": first_release["publishedDate"],
+                    "publisher": {
+                        "publisher_name": first_release["publisher/name"],
+                        "publisher_id": first_release["publisher/uid"],
+                        "publisher_scheme": first_release["publisher/scheme"],
+                        "uri": first_release["publisher/uri"],
+                        "ocid_prefix": get_ocid_prefix(first_release["releases/0/ocid"]),
+                        "contact_name": first_release["releases/0/buyer/contactPoint/name"] or "",
+                        "contact_email": first_release["releases/0/buyer/contactPoint/email"] or "",
+                        "contact_telephone": first_release["releases/0/buyer/contactPoint/telephone"] or "",
+                    },
+                })
+                convert_output_file(output_file, simple_csv_df)
+            output_files.append(output_file)
+    return output_files
+
+
+def build_spilled_output_files(partition_dir, name, parent_directory, load_data, spend_seed=None):
+    """
+    build_output_files for a partition spilled to disk by spill_cf_file, read
+    in the worker so only the partitions being built are held in memory
+    """
+    partition_df = read_spilled_partition(partition_dir)
+    return build_output_files(name, partition_df, parent_directory, load_data, spend_seed=spend_seed)
+
+
+def convert_output_file(output_file, simple_csv_df):
+    """
+    Work out the field coverage of a simple CSV submission and convert it to
+    OCDS JSON in the upload directory of the FileSubmission it will be loaded
+    into, working from the dataframe rather than re-reading the CSV. Adds the
+    results to the output_file dict.
+
+    :param output_file: dict from build_output_files
+    :param simple_csv_df: dataframe of the simple CSV submission
+    """
+    simple_csv_file_path = output_file["simple_csv_file_path"]
+    try:
+        simple_csv_mapper = CSVMapper(input_df=simple_csv_df)
+        coverage_context = simple_csv_mapper.get_coverage_context()
+        output_file["coverage_release_type"] = simple_csv_mapper.release_type
+        output_file["average_field_completion"] = coverage_context.get("average_field_completion")
+
+        # The FileSubmission ID is the Contracts Finder ID, so its upload directory is known before it's saved
+        submission = SuppliedData(id=uuid.UUID(output_file["contracts_finder_id"]))
+        conversion_context = convert_simple_csv_dataframe(
+            submission.upload_dir(),
+            submission.upload_url(),
+            simple_csv_df,
+            Publisher(**output_file["publisher"]),
+            LibCoveOCDSConfig(),
+            OCDS_RELEASE_SCHEMA,
+            release_type=simple_csv_mapper.release_type
+        )
+        output_file["converted_path"] = conversion_context.get("converted_path")
+    except FileNotFoundError:
+        logger.exception("Error converting %s", simple_csv_file_path)
+
+
+def load_output_files(output_files, load_data, unflatten_contracts_finder_data=False):
+    """
+    Load the submissions created by build_output_files into the database.
+    Always run in the main process so there is a single database writer.
+
+    :param output_files: list of dicts from build_output_files
+    :param load_data: Boolean indicating that the data should be loaded
+    :param unflatten_contracts_finder_data: Run legacy unflattening of raw CF data (used for dev/debugging)
+    """
+    for output_file in output_files:
+        # Upload simple CSV to DB
+        if load_data:
+            name = output_file["name"]
+            try:
+                publisher_fields = output_file["publisher"]
+                publisher_name = publisher_fields["publisher_name"]
+
+                # helpers.SimpleSubmissionHelpers().load_simple_csv_into_database(simple_csv_df, publisher)
+                # Load data from Simple CSV
+                logger.debug("Creating or updating Publisher %s (id %s)", publisher_name, publisher_fields["publisher_id"])
+                publisher, created = Publisher.objects.update_or_create(
+                    publisher_name=publisher_name,
+                    defaults=publisher_fields
+                )
+
+                published_date = output_file["published_date"]
+                contracts_finder_id = output_file["contracts_finder_id"]
+
+                logger.info("Creating FileSubmission %s uri %s date %s", publisher.publisher_name, contracts_finder_id, published_date)
+                # Create FileSubmission entry
+                supplied_data, created = FileSubmission.objects.update_or_create(
+                    id=contracts_finder_id,
+                    defaults={
+                        "current_app": "silvereye",
+                        "notice_type": output_file["notice_type"],
+                    }
+                )
+                supplied_data.publisher = publisher
+                supplied_data.created = published_date
+                if supplied_data.original_file and os.path.exists(supplied_data.original_file.path):
+                    os.remove(supplied_data.original_file.path)
+                supplied_data.original_file.save(output_file["simple_csv_file_name"],
+                                                 File(open(output_file["simple_csv_file_path"])))
+                supplied_data.save()
+
+                if settings.STORE_OCDS_IN_S3:
+                    sync_with_s3(supplied_data)
+
+                # Store field coverage
+                coverage_release_type = output_file.get("coverage_release_type")
+                average_field_completion = output_file.get("average_field_completion")
+                FieldCoverage.objects.update_or_create(
+                    file_submission=supplied_data,
+                    defaults={
+                        "tenders_field_coverage": average_field_completion if coverage_release_type == "tender" else None,
+                        "awards_field_coverage": average_field_completion if coverage_release_type == "award" else None,
+                        "spend_field_coverage": average_field_completion if coverage_release_type == "spend" else None,
+                    }
+                )
+
+                converted_path = output_file.get("converted_path")
+                if not converted_path:
+                    raise FileNotFoundError(f"No conversion of {output_file['simple_csv_file_path']}")
+                UpsertDataHelpers().upsert_ocds_data(converted_path, supplied_data)
+            except FileNotFoundError:
+                logger.exception("Error loading data for %s in %s", name, output_file["parent_directory"])
+
+        if unflatten_contracts_finder_data:
+            unflatten_cf_data(output_file["json_file_path"], output_file["last_published_date"], load_data,
+                              output_file["output_dir"])
+
+
+def create_partition_output_files(builder, partitions, load_data, workers=1):
+    """
+    Build the output files for a list of week/publisher partitions, in a pool
+    of worker processes if workers > 1, and load each into the database in the
+    main process as soon as it and the partitions before it are built.
+
+    :param builder: build_output_files, or another function with the same return value
+    :param partitions: list of argument tuples for builder
+    :param load_data: Boolean indicating that the data should be loaded
+    :param workers: number of processes to use
+    """
+    if workers > 1 and len(partitions) > 1:
+        logger.info("Building %s partitions with %s workers", len(partitions), workers)
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields in partition order, so database writes happen in the same order as a serial run
+            for output_files in executor.map(builder, *zip(*partitions)):
+                load_output_files(output_files, load_data)
+    else:
+        for partition_args in partitions:
+            load_output_files(builder(*partition_args), load_data)
 
 
 def remake_dir(directory):
@@ -625,19 +1107,54 @@ class Command(BaseCommand):
         parser.add_argument("--publisher_submissions", action='store_true',
                             help="Group data into publisher submissions")
         parser.add_argument("--load_data", action='store_true', help="Load data into database")
+        parser.add_argument("--download_workers", type=int, default=4,
+                            help="Number of concurrent downloads from Contracts Finder")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of processes used to preprocess the daily CSV files")
+        parser.add_argument("--spend_seed", type=int, default=0,
+                            help="Seed for the random dates used in the fake spend data")
+        parser.add_argument("--chunksize", type=int,
+                            help="Read the daily CSV files this many rows at a time, spilling each week and "
+                                 "publisher to disk, to limit memory use")
+        parser.add_argument("--no_cache", action='store_true',
+                            help="Don't use or update the Parquet cache of preprocessed daily files")
+        parser.add_argument("--incremental", action='store_true',
+                            help="Only rebuild (and reload) the weeks whose source files have changed since the "
+                                 "last run")
+        parser.add_argument("--cf_url", type=str, default=CF_HARVESTER_URL,
+                            help="Base URL of the Contracts Finder Harvester CSV endpoint")
 
     def handle(self, *args, **kwargs):
         """handle get_cf_data"""
 
         publisher_names = get_publisher_names()
-        remake_dir(SOURCE_DIR)
-        remake_dir(CLEAN_OUTPUT_DIR)
-        remake_dir(SAMPLE_SUBMISSIONS_DIR)
         file_path = kwargs.get("file_path")
+        incremental = kwargs.get("incremental")
+        if incremental and file_path:
+            raise CommandError("--incremental can only be used when downloading data, not with --file_path")
+        if incremental and kwargs.get("chunksize"):
+            raise CommandError("--incremental can't be combined with --chunksize")
+        # Keep previously downloaded days unless importing a local file
+        if file_path:
+            remake_dir(SOURCE_DIR)
+        else:
+            os.makedirs(SOURCE_DIR, exist_ok=True)
+        # Keep previous outputs for incremental runs, only changed weeks are rebuilt
+        if incremental:
+            os.makedirs(CLEAN_OUTPUT_DIR, exist_ok=True)
+            os.makedirs(SAMPLE_SUBMISSIONS_DIR, exist_ok=True)
+        else:
+            remake_dir(CLEAN_OUTPUT_DIR)
+            remake_dir(SAMPLE_SUBMISSIONS_DIR)
 
         options = {
             'publisher_submissions': kwargs.get("publisher_submissions"),
-            'load_data': kwargs.get("load_data")
+            'load_data': kwargs.get("load_data"),
+            'workers': kwargs.get("workers"),
+            'spend_seed': kwargs.get("spend_seed"),
+            'chunksize': kwargs.get("chunksize"),
+            'incremental': incremental,
+            'cache': not kwargs.get("no_cache"),
         }
 
         start_date = kwargs.get("start_date")
@@ -655,24 +1172,21 @@ class Command(BaseCommand):
             elif file_path.endswith(".csv"):
                 shutil.copy(file_path, SOURCE_DIR)
         if start_date:
-            daterange = pd.date_range(start_date, end_date)
             logger.info("Downloading needed Contracts Finder data from %s to %s", start_date, end_date)
-            for date in daterange:
-                date_string = f"{date.year}/{date.month:02}/{date.day:02}"
-                save_path = join(SOURCE_DIR, slugify(date_string) + ".csv")
-                url = f"https://www.contractsfinder.service.gov.uk/Harvester/Notices/Data/CSV/{date_string}"
-
-                try:
-                    if not os.path.exists(save_path):
-                        urllib.request.urlretrieve(url, save_path)
-                        logger.info("Downloading URL: %s", url)
-                except TypeError:
-                    logger.exception("Error with URL: %s", url)
+            downloader = ContractsFinderDownloader(
+                SOURCE_DIR,
+                base_url=kwargs.get("cf_url") or CF_HARVESTER_URL,
+                workers=kwargs.get("download_workers") or 4,
+            )
+            summary = downloader.download_range(start_date, end_date)
+            self.stdout.write(f"Contracts Finder download: {summary}")
         else:
             self.print_help('manage.py', '<your command name>')
             sys.exit()
 
-        process_contracts_finder_csv(publisher_names, start_date, end_date, options, file_path)
+        manifest = SourceManifest(MANIFEST_PATH, download_state_path=join(SOURCE_DIR, DOWNLOAD_STATE_FILE))
+        process_contracts_finder_csv(publisher_names, start_date, end_date, options, file_path, manifest=manifest)
+        manifest.save()
 
         # Update publisher metrics
         update_publisher_monthly_counts()
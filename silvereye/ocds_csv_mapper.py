@@ -1,9 +1,11 @@
 import json
+import threading
 from collections import OrderedDict
 
 from datetime import datetime
 
 import os
+from types import MappingProxyType
 
 import dateparser
 import numpy as np
@@ -13,6 +15,91 @@ from django.conf import settings
 from silvereye.field_coverage import check_coverage
 
 
+class MappingRegistry:
+    """
+    Read-only lookups precompiled from a mappings CSV for one release type.
+    Built once per (mappings file, modification time, release type) by
+    get_mapping_registry and shared by every CSVMapper, so don't modify the
+    dataframes it holds.
+    """
+
+    def __init__(self, mappings_df, release_type=None):
+        self.mappings_df = mappings_df
+        self.release_type = release_type
+
+        # OCDS URI to simple CSV header for every mapped header, used to rename validation errors
+        self.uri_to_header = MappingProxyType(OrderedDict(
+            (uri, csv_header) for uri, csv_header in self._rows("uri", "csv_header") if csv_header
+        ))
+        # Contracts Finder daily CSV path to OCDS URI, for the CF mappings file
+        self.cf_path_to_uri = MappingProxyType(OrderedDict(
+            (cf_path, uri) for cf_path, uri in self._rows("contracts_finder_daily_csv_path", "uri") if uri
+        ))
+        self.cf_paths = tuple(cf_path for cf_path, in self._rows("contracts_finder_daily_csv_path"))
+
+        self.simple_mappings_df = None
+        self.simple_csv_df = None
+        if release_type:
+            self.simple_mappings_df = mappings_df.loc[mappings_df[f'{release_type}_csv'] == True]
+            self.simple_csv_df = mappings_df.loc[
+                (mappings_df[f'{release_type}_csv'] == True) & (pd.notnull(mappings_df['csv_header']))]
+            simple_rows = list(self.simple_mappings_df[["uri", "csv_header", "default", "reference", "required"]]
+                               .itertuples(index=False, name=None))
+            # Simple CSV header to OCDS URI, for unflattening
+            self.header_to_uri = MappingProxyType(OrderedDict(
+                (csv_header, uri) for uri, csv_header, _, _, _ in simple_rows if csv_header
+            ))
+            # Every OCDS URI in the simple CSV to its header (None if it has none), for output_simple_csv
+            self.simple_uri_to_header = MappingProxyType(OrderedDict(
+                (uri, csv_header) for uri, csv_header, _, _, _ in simple_rows
+            ))
+            self.simple_csv_headers = tuple(csv_header for _, csv_header, _, _, _ in simple_rows if csv_header)
+            # (uri, default, reference) in mappings order, as augment_cols applies them in turn
+            self.augmentations = tuple(
+                (uri, default, reference) for uri, _, default, reference, _ in simple_rows if default or reference
+            )
+            self.required_headers = frozenset(
+                csv_header for _, csv_header, _, _, required in simple_rows if required == True and csv_header
+            )
+
+    def _rows(self, *columns):
+        if not all(column in self.mappings_df.columns for column in columns):
+            return []
+        return list(self.mappings_df[list(columns)].itertuples(index=False, name=None))
+
+
+_mapping_registries = {}
+_mapping_registries_lock = threading.RLock()
+
+
+def get_mapping_registry(mappings_file, release_type=None):
+    """
+    Return the shared MappingRegistry for a mappings file and release type,
+    building it the first time it's needed or when the file has changed
+
+    :param mappings_file: path to a mappings CSV
+    :param release_type: notice type, or None for just the release type independent lookups
+    :return: MappingRegistry
+    """
+    mappings_file = os.path.abspath(mappings_file)
+    key = (mappings_file, os.path.getmtime(mappings_file), release_type)
+    registry = _mapping_registries.get(key)
+    if registry is None:
+        with _mapping_registries_lock:
+            registry = _mapping_registries.get(key)
+            if registry is None:
+                if release_type:
+                    mappings_df = get_mapping_registry(mappings_file).mappings_df
+                else:
+                    mappings_df = pd.read_csv(mappings_file, na_values=[""]).replace({np.nan: None})
+                registry = MappingRegistry(mappings_df, release_type)
+                # Drop registries for older versions of the file
+                for old_key in [k for k in _mapping_registries if k[0] == mappings_file and k[1] != key[1]]:
+                    del _mapping_registries[old_key]
+                _mapping_registries[key] = registry
+    return registry
+
+
 class CSVMapper:
     """
     Class to handle mapping of CSV headers between simple CSV and flattened OCDS
@@ -25,23 +112,25 @@ class CSVMapper:
         "spend",
     ]
 
-    def __init__(self, csv_path=None, release_type=None, mappings_file=None):
+    def __init__(self, csv_path=None, release_type=None, mappings_file=None, input_df=None):
         if mappings_file:
             self.mappings_file = mappings_file
-        self.mappings_df = self._read_csv_to_dataframe(self.mappings_file)
+        self.mappings = get_mapping_registry(self.mappings_file)
+        self.mappings_df = self.mappings.mappings_df
         self.csv_path = csv_path
         self.release_type = release_type
         self.ocid_prefix = "ocds-testprefix-"
         if csv_path:
             self.input_df = self._read_csv_to_dataframe(csv_path)
-            if not release_type:
-                self.detect_notice_type(self.input_df)
         else:
-            self.input_df = None
+            # A simple CSV that is already in memory
+            self.input_df = input_df
+        if self.input_df is not None and not release_type:
+            self.detect_notice_type(self.input_df)
         if self.release_type:
-            self.simple_mappings_df = self.mappings_df.loc[self.mappings_df[f'{self.release_type}_csv'] == True]
-            self.simple_csv_df = self.mappings_df.loc[
-                (self.mappings_df[f'{self.release_type}_csv'] == True) & (pd.notnull(self.mappings_df['csv_header']))]
+            self.mappings = get_mapping_registry(self.mappings_file, self.release_type)
+            self.simple_mappings_df = self.mappings.simple_mappings_df
+            self.simple_csv_df = self.mappings.simple_csv_df
 
     def _read_csv_to_dataframe(self, mappings_csv_path):
         df = pd.read_csv(mappings_csv_path, na_values=[""])
@@ -68,16 +157,11 @@ class CSVMapper:
         :param df: pandas dataframe of a simple CSV file
         :return:
         """
-        mapping_dict = {}
         # Remove unknown columns
-        cols_list = self.simple_mappings_df["csv_header"].to_list()
-        new_df = df[df.columns.intersection(cols_list)]
+        new_df = df[df.columns.intersection(list(self.mappings.simple_csv_headers))]
 
         # rename simple CSV headers to OCDS uri headers
-        for i, row in self.simple_mappings_df.iterrows():
-            if row["csv_header"]:
-                mapping_dict[row["csv_header"]] = row["uri"]
-        new_df = new_df.rename(columns=mapping_dict)
+        new_df = new_df.rename(columns=self.mappings.header_to_uri)
         return new_df
 
     def convert_cf_to_1_1(self, contracts_finder_df):
@@ -93,14 +177,9 @@ class CSVMapper:
         :return:
         """
         # Clear cols not in mappings
-        cf_mappings = self.mappings_df.loc[pd.notnull(self.mappings_df['uri'])]
-        cols_list = cf_mappings["contracts_finder_daily_csv_path"].to_list()
-        new_df = contracts_finder_df[contracts_finder_df.columns.intersection(cols_list)]
-
-        mapping_dict = {}
-        for i, row in cf_mappings.iterrows():
-            mapping_dict[row["contracts_finder_daily_csv_path"]] = row["uri"]
-        new_df = new_df.rename(columns=mapping_dict)
+        cf_path_to_uri = self.mappings.cf_path_to_uri
+        new_df = contracts_finder_df[contracts_finder_df.columns.intersection(list(cf_path_to_uri))]
+        new_df = new_df.rename(columns=cf_path_to_uri)
 
         # Add buyer refs
         new_df['buyer/name'] = new_df['parties/0/name']
@@ -117,10 +196,7 @@ class CSVMapper:
         :param df: dataframe of a simple CSV with headers mapped to OCDS
         :return:
         """
-        for i, row in self.simple_mappings_df.iterrows():
-            ocds_header = row["uri"]
-            default_value = row["default"]
-            reference_header = row["reference"]
+        for ocds_header, default_value, reference_header in self.mappings.augmentations:
             # Set defaults from mapping sheet
             if default_value:
                 df[ocds_header] = default_value
@@ -143,13 +219,10 @@ class CSVMapper:
         return df
 
     def output_simple_csv(self, df):
-        mapping_dict = OrderedDict()
-        for i, row in self.simple_mappings_df.iterrows():
-            mapping_dict[row["uri"]] = row["csv_header"]
-        new_df = df.rename(columns=mapping_dict)
+        new_df = df.rename(columns=self.mappings.simple_uri_to_header)
 
         # Clear cols not in simple CSV
-        cols_list = [i for i in self.simple_csv_df["csv_header"].to_list() if i]
+        cols_list = list(self.mappings.simple_csv_headers)
         new_df = new_df[new_df.columns.intersection(cols_list)]
 
         # Augment expected simple CSV cols
@@ -172,12 +245,22 @@ class CSVMapper:
 
     def convert_simple_csv_to_ocds_csv(self, csv_path):
         df = pd.read_csv(csv_path)
+        new_df = self.convert_simple_csv_df_to_ocds_df(df)
+        new_df.to_csv(open(csv_path, "w"), index=False, header=True)
+        return new_df
+
+    def convert_simple_csv_df_to_ocds_df(self, df):
+        """
+        Map a dataframe of a simple CSV to flattened OCDS release headers, ready for unflattening
+
+        :param df: pandas dataframe of a simple CSV file
+        :return: dataframe with OCDS URI headers
+        """
         new_df = self.rename_friendly_cols_to_ocds_uri(df)
         if not self.release_type:
             self.detect_notice_type(new_df)
         new_df = self.parse_dates(new_df)
         new_df = self.augment_cols(new_df)
-        new_df.to_csv(open(csv_path, "w"), index=False, header=True)
         return new_df
 
     def create_simple_CSV_templates(self, output_dir):
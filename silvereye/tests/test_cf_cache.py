@@ -0,0 +1,51 @@
+import os
+from os.path import join
+
+import pandas as pd
+import pytest
+
+from silvereye.lib.cf_cache import CFFrameCache, mappings_version
+from silvereye.management.commands.get_cf_data import preprocess_cf_file, CF_MAPPINGS_FILE
+
+TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+CF_DAILY_CSV = join(TESTS_DIR, "fixtures", "CF_CSV", "export-2020-08-05.csv")
+
+
+def test_mappings_version(tmp_path):
+    mappings_file = tmp_path / "mappings.csv"
+    mappings_file.write_text(open(CF_MAPPINGS_FILE).read())
+    version = mappings_version(str(mappings_file), 1)
+
+    assert mappings_version(str(mappings_file), 2) != version
+    mappings_file.write_text(open(CF_MAPPINGS_FILE).read() + "\n")
+    assert mappings_version(str(mappings_file), 1) != version
+
+
+def test_preprocess_cf_file_date_window():
+    fixed_df = preprocess_cf_file(CF_DAILY_CSV)
+    start = fixed_df['publishedDate'].min()
+    windowed_df = preprocess_cf_file(CF_DAILY_CSV, date_window=(start, pd.Timestamp("2020-08-10", tz="UTC")))
+
+    assert len(windowed_df) == (fixed_df['publishedDate'] > start).sum()
+    assert windowed_df.index.tolist() == list(range(len(windowed_df)))
+
+
+def test_preprocess_cf_file_cache(tmp_path):
+    pytest.importorskip("pyarrow")
+    cache = CFFrameCache(str(tmp_path), "v1")
+    fixed_df = preprocess_cf_file(CF_DAILY_CSV, cache=cache)
+    cache_key = cache.key_for_file(CF_DAILY_CSV)
+    assert os.path.exists(cache.path_for(cache_key))
+
+    pd.testing.assert_frame_equal(preprocess_cf_file(CF_DAILY_CSV, cache=cache), fixed_df)
+
+    date_window = (fixed_df['publishedDate'].min(), pd.Timestamp("2020-08-10", tz="UTC"))
+    pd.testing.assert_frame_equal(preprocess_cf_file(CF_DAILY_CSV, cache=cache, date_window=date_window),
+                                  preprocess_cf_file(CF_DAILY_CSV, date_window=date_window))
+
+    projected_df = cache.get(cache_key, columns=['publishedDate'])
+    assert projected_df.columns.tolist() == ['publishedDate']
+
+    # Entries for other mappings versions are removed
+    CFFrameCache(str(tmp_path), "v2").prune()
+    assert not os.listdir(str(tmp_path))
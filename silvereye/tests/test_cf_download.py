@@ -0,0 +1,105 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from silvereye.lib.cf_download import ContractsFinderDownloader, DOWNLOADED, FAILED, NOT_MODIFIED, SKIPPED
+
+DAILY_CSV = b"publishedDate,releases/0/ocid\n2020-08-05T10:00:00Z,ocds-b5fd17-1\n"
+
+
+class HarvesterStandIn(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the Contracts Finder Harvester CSV endpoint
+    """
+    requests_seen = []
+    fail_next = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_seen.append((self.path, dict(self.headers)))
+        if cls.fail_next:
+            cls.fail_next -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path.endswith("/2020/08/07"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = '"v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = DAILY_CSV
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            body = body[start:]
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def harvester():
+    HarvesterStandIn.requests_seen = []
+    HarvesterStandIn.fail_next = 0
+    server = HTTPServer(("127.0.0.1", 0), HarvesterStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/CSV"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_range(harvester, tmp_path):
+    downloader = ContractsFinderDownloader(str(tmp_path), base_url=harvester, workers=3, backoff=0)
+    summary = downloader.download_range("2020-08-04", "2020-08-07")
+
+    assert summary.counts[DOWNLOADED] == 3
+    assert summary.counts[FAILED] == 1
+    assert summary.bytes_downloaded == 3 * len(DAILY_CSV)
+    assert open(os.path.join(tmp_path, "20200805.csv"), "rb").read() == DAILY_CSV
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".part")]
+
+    # Finished days are not requested again
+    HarvesterStandIn.requests_seen = []
+    summary = ContractsFinderDownloader(str(tmp_path), base_url=harvester).download_range("2020-08-04", "2020-08-06")
+    assert summary.counts[SKIPPED] == 3
+    assert HarvesterStandIn.requests_seen == []
+
+
+def test_download_conditional_request(harvester, tmp_path):
+    downloader = ContractsFinderDownloader(str(tmp_path), base_url=harvester, backoff=0)
+    downloader.download_range("2020-08-05", "2020-08-05")
+    # Pretend the file was fetched while the day was still in progress
+    downloader.state["20200805.csv"]["complete"] = False
+    downloader.save_state()
+
+    summary = ContractsFinderDownloader(str(tmp_path), base_url=harvester).download_range("2020-08-05", "2020-08-05")
+    assert summary.counts[NOT_MODIFIED] == 1
+    assert HarvesterStandIn.requests_seen[-1][1]["If-None-Match"] == '"v1"'
+
+
+def test_download_resumes_partial_file_after_retry(harvester, tmp_path):
+    with open(os.path.join(tmp_path, "20200805.csv.part"), "wb") as f:
+        f.write(DAILY_CSV[:10])
+    HarvesterStandIn.fail_next = 1
+
+    downloader = ContractsFinderDownloader(str(tmp_path), base_url=harvester, retries=2, backoff=0)
+    summary = downloader.download_range("2020-08-05", "2020-08-05")
+
+    assert summary.counts[DOWNLOADED] == 1
+    assert len(HarvesterStandIn.requests_seen) == 2
+    assert HarvesterStandIn.requests_seen[-1][1]["Range"] == "bytes=10-"
+    assert open(os.path.join(tmp_path, "20200805.csv"), "rb").read() == DAILY_CSV
@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+from os.path import join
+
+import numpy as np
+import pandas as pd
+from libcoveocds.config import LibCoveOCDSConfig
+from django.template.defaultfilters import slugify
+
+from silvereye.management.commands import get_cf_data
+from silvereye.management.commands.get_cf_data import preprocess_cf_files, fix_contracts_finder_flat_csv, \
+    set_scheme, set_uid, set_uri, new_ocid_prefix, synthesise_spend, spend_rng, get_date_boundaries, spill_cf_file, \
+    read_spilled_partition, preprocess_cf_file, partition_cf_releases, get_release_periods, plan_incremental_run, \
+    build_output_files, create_partition_output_files
+from silvereye.helpers import convert_simple_csv_file
+from silvereye.models import Publisher
+from silvereye.ocds_csv_mapper import CSVMapper
+from silvereye.lib.cf_manifest import SourceManifest
+
+TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+CF_DIR = join(TESTS_DIR, "fixtures", "CF_CSV")
+CF_DAILY_FILES = [
+    join(CF_DIR, "export-2020-08-05.csv"),
+    join(CF_DIR, "export-2020-08-05_single_buyer.csv"),
+]
+
+
+def test_preprocess_cf_files_parallel_matches_serial():
+    serial_df = pd.concat(list(preprocess_cf_files(CF_DAILY_FILES).values()), ignore_index=True)
+    parallel_df = pd.concat(list(preprocess_cf_files(CF_DAILY_FILES, workers=2).values()), ignore_index=True)
+
+    pd.testing.assert_frame_equal(serial_df, parallel_df)
+
+
+def test_fix_contracts_finder_flat_csv_matches_row_functions(contracts_finder_daily_csv_df):
+    fixed_df = fix_contracts_finder_flat_csv(contracts_finder_daily_csv_df)
+    source_df = contracts_finder_daily_csv_df.copy()
+    source_df['publisher/name'] = source_df['releases/0/buyer/name']
+    source_df['publisher/uid'] = source_df.apply(set_uid, axis=1)
+
+    assert fixed_df['publisher/scheme'].tolist() == source_df.apply(set_scheme, axis=1).tolist()
+    assert fixed_df['publisher/uid'].tolist() == source_df['publisher/uid'].tolist()
+    assert fixed_df['publisher/uri'].tolist() == source_df.apply(set_uri, axis=1).tolist()
+    assert fixed_df['releases/0/ocid'].tolist() == source_df.apply(new_ocid_prefix, axis=1).tolist()
+    assert not fixed_df['releases/0/id'].str.contains('ocds-b5fd17-').any()
+
+
+def test_synthesise_spend():
+    award_df = pd.read_csv(join(CF_DIR, "export-2020-07-01_awards.csv"))
+    spend_df = synthesise_spend(award_df, spend_rng(0, "20200629-20200706", "all"))
+
+    assert len(spend_df) == len(award_df) == 10
+    assert (spend_df['releases/0/tag'] == "implementation").all()
+    assert spend_df['releases/0/ocid'].str.endswith("_trans1").all()
+    assert spend_df['uri'].str.endswith("1234.json").all()
+    publish_delay = pd.to_datetime(spend_df['releases/0/date']) - pd.to_datetime(award_df['releases/0/date'])
+    assert publish_delay.dt.days.between(10, 19).all()
+    transaction_delay = (pd.to_datetime(spend_df['releases/0/contracts/0/implementation/transactions/0/date']) -
+                         pd.to_datetime(award_df['releases/0/awards/0/date']))
+    assert transaction_delay.dt.days.between(10, 19).all()
+    assert spend_df['releases/0/contracts/0/items/0/id'].equals(award_df['releases/0/tender/items/0/id'])
+
+    # The same seed and partition give the same data
+    pd.testing.assert_frame_equal(spend_df, synthesise_spend(award_df, spend_rng(0, "20200629-20200706", "all")))
+
+
+def test_spill_cf_file_matches_in_memory_partitions(tmp_path):
+    source_file_path = join(CF_DIR, "export-2020-08-05.csv")
+    date_boundaries = list(get_date_boundaries("2020-08-03", "2020-08-09", None))
+    spill_cf_file(source_file_path, None, date_boundaries, str(tmp_path), chunksize=5)
+
+    fixed_df = preprocess_cf_file(source_file_path)
+    period_dir = join(tmp_path, "20200803-20200810")
+    partition_names = sorted(os.listdir(period_dir))
+    assert len(partition_names) == fixed_df['publisher/name'].nunique()
+    for publisher_name, publisher_df in fixed_df.groupby('publisher/name'):
+        spilled_df = read_spilled_partition(join(period_dir, slugify(publisher_name)))
+        assert spilled_df['releases/0/ocid'].tolist() == publisher_df['releases/0/ocid'].tolist()
+        assert spilled_df['publishedDate'].tolist() == publisher_df['publishedDate'].tolist()
+
+
+def test_spill_cf_file_filters_publishers(tmp_path):
+    source_file_path = join(CF_DIR, "export-2020-08-05.csv")
+    date_boundaries = list(get_date_boundaries("2020-08-03", "2020-08-09", None))
+    spill_cf_file(source_file_path, ["Telford & Wrekin Council"], date_boundaries, str(tmp_path), publisher_submissions=False)
+
+    spilled_df = read_spilled_partition(join(tmp_path, "20200803-20200810", "all"))
+    assert set(spilled_df['publisher/name']) == {"Telford & Wrekin Council"}
+
+
+def test_partition_cf_releases_matches_period_masks():
+    source_df = pd.concat(list(preprocess_cf_files(CF_DAILY_FILES).values()), ignore_index=True)
+    # Spread the releases over three weeks
+    source_df['publishedDate'] += pd.to_timedelta(source_df.index % 3 * 7, unit="D")
+    date_boundaries = list(get_date_boundaries("2020-08-03", "2020-08-23", None))
+    partitions = partition_cf_releases(source_df, date_boundaries)
+
+    assert sorted(partitions) == [0, 1, 2]
+    for period_index, (start, end) in enumerate(date_boundaries):
+        period_df = source_df[(source_df['publishedDate'] > start) & (source_df['publishedDate'] <= end)]
+        expected = {slugify(name): df.index.tolist() for name, df in period_df.groupby('publisher/name')}
+        actual = {name: df.index.tolist() for name, df in partitions.get(period_index, [])}
+        assert actual == expected
+
+    partitions = partition_cf_releases(source_df, date_boundaries, publisher_submissions=False)
+    assert sum(len(df) for name, df in partitions[0]) == len(source_df[source_df.index % 3 == 0])
+
+
+def test_plan_incremental_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_cf_data, "CLEAN_OUTPUT_DIR", str(tmp_path / "cleaned"))
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    file_list = []
+    for source_file_path in CF_DAILY_FILES:
+        file_list.append(str(source_dir / os.path.basename(source_file_path)))
+        shutil.copy(source_file_path, file_list[-1])
+    date_boundaries = list(get_date_boundaries("2020-08-03", "2020-08-16", None))
+    manifest = SourceManifest(str(tmp_path / "manifest.json"))
+
+    # Everything is new on the first run
+    source_data, rebuild_periods, changed = plan_incremental_run(manifest, file_list, date_boundaries)
+    assert list(source_data) == file_list
+    assert set(changed) == set(file_list)
+    assert rebuild_periods == {"20200803-20200810", "20200810-20200817"}
+    for path, df in source_data.items():
+        assert get_release_periods(df, date_boundaries) == {"20200803-20200810"}
+        manifest.record_source(path, get_release_periods(df, date_boundaries))
+    for start, end in date_boundaries:
+        period_name = start.strftime("%Y%m%d") + "-" + end.strftime("%Y%m%d")
+        manifest.record_period(period_name, sources=file_list, partitions=["all"])
+        os.makedirs(join(get_cf_data.CLEAN_OUTPUT_DIR, period_name))
+    manifest.save()
+
+    # Nothing has changed
+    manifest = SourceManifest(str(tmp_path / "manifest.json"))
+    source_data, rebuild_periods, changed = plan_incremental_run(manifest, file_list, date_boundaries)
+    assert (source_data, rebuild_periods, changed) == ({}, set(), {})
+
+    # A changed file rebuilds its week, which also needs the unchanged file from that week
+    with open(file_list[1], "a") as f:
+        f.write("\n")
+    source_data, rebuild_periods, changed = plan_incremental_run(manifest, file_list, date_boundaries)
+    assert list(changed) == [file_list[1]]
+    assert rebuild_periods == {"20200803-20200810"}
+    assert list(source_data) == file_list
+
+
+def test_source_manifest_uses_download_fetch_time(tmp_path):
+    source_file_path = join(CF_DIR, "export-2020-08-05.csv")
+    download_state_path = tmp_path / "download_state.json"
+    download_state_path.write_text(json.dumps({"export-2020-08-05.csv": {"fetched_at": "2020-08-06T01:00:00Z"}}))
+    manifest = SourceManifest(str(tmp_path / "manifest.json"), download_state_path=str(download_state_path))
+    manifest.record_source(source_file_path, {"20200803-20200810"})
+
+    assert manifest.sources["export-2020-08-05.csv"]["fetched_at"] == "2020-08-06T01:00:00Z"
+    assert manifest.changed_sources([source_file_path]) == {}
+
+
+def test_create_partition_output_files_parallel_matches_serial(tmp_path, monkeypatch):
+    source_df = pd.concat(list(preprocess_cf_files(CF_DAILY_FILES).values()), ignore_index=True)
+    date_boundaries = list(get_date_boundaries("2020-08-03", "2020-08-09", None))
+    period_partitions = partition_cf_releases(source_df, date_boundaries)[0]
+
+    for run in ["serial", "parallel"]:
+        submissions_dir = tmp_path / run / "submissions"
+        period_dir = tmp_path / run / "20200803-20200810"
+        submissions_dir.mkdir(parents=True)
+        period_dir.mkdir()
+        monkeypatch.setattr(get_cf_data, "SAMPLE_SUBMISSIONS_DIR", str(submissions_dir))
+        partitions = [(name, df, str(period_dir), False, 0) for name, df in period_partitions]
+        create_partition_output_files(build_output_files, partitions, False, workers=1 if run == "serial" else 3)
+
+    serial_files = sorted(os.listdir(tmp_path / "serial" / "submissions"))
+    assert serial_files
+    assert sorted(os.listdir(tmp_path / "parallel" / "submissions")) == serial_files
+    for file_name in serial_files:
+        assert (tmp_path / "parallel" / "submissions" / file_name).read_text() == \
+            (tmp_path / "serial" / "submissions" / file_name).read_text()
+
+
+def test_build_output_files_converts_without_database(tmp_path, monkeypatch, settings):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    monkeypatch.setattr(get_cf_data, "SAMPLE_SUBMISSIONS_DIR", str(tmp_path))
+    fixed_df = preprocess_cf_file(join(CF_DIR, "export-2020-08-05_single_buyer.csv"))
+    output_files = build_output_files("all", fixed_df, str(tmp_path), True)
+
+    assert [output_file["notice_type"] for output_file in output_files] == ["tender"]
+    output_file = output_files[0]
+    assert output_file["converted_path"].startswith(settings.MEDIA_ROOT)
+    releases = json.load(open(output_file["converted_path"]))["releases"]
+    assert len(releases) == len(fixed_df)
+    assert output_file["publisher"]["publisher_name"] == fixed_df.iloc[0]["publisher/name"]
+    assert output_file["average_field_completion"] > 0
+
+
+def test_in_memory_conversion_matches_file_conversion(tmp_path, monkeypatch, settings):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    monkeypatch.setattr(get_cf_data, "SAMPLE_SUBMISSIONS_DIR", str(tmp_path))
+    award_df = pd.read_csv(join(CF_DIR, "export-2020-07-01_awards.csv")).replace({np.nan: None})
+    award_df['publishedDate'] = pd.to_datetime(award_df['publishedDate'])
+    output_files = build_output_files("all", award_df, str(tmp_path), True, spend_seed=0)
+    assert [output_file["notice_type"] for output_file in output_files] == ["award", "spend"]
+
+    for output_file in output_files:
+        file_mapper = CSVMapper(csv_path=output_file["simple_csv_file_path"])
+        assert output_file["average_field_completion"] == file_mapper.get_coverage_context()["average_field_completion"]
+        conversion_context = convert_simple_csv_file(
+            str(tmp_path / output_file["notice_type"]),
+            "/",
+            output_file["simple_csv_file_path"],
+            Publisher(**output_file["publisher"]),
+            LibCoveOCDSConfig(),
+            get_cf_data.OCDS_RELEASE_SCHEMA
+        )
+        expected = json.load(open(conversion_context["converted_path"]))
+        actual = json.load(open(output_file["converted_path"]))
+        assert actual["releases"] == expected["releases"]
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+from django.conf import settings
+
+from silvereye.ocds_csv_mapper import CSVMapper, get_mapping_registry
+
+
+def test_mapping_registry_is_shared():
+    tender_mapper = CSVMapper(release_type="tender")
+
+    assert CSVMapper(release_type="tender").mappings is tender_mapper.mappings
+    assert CSVMapper(release_type="award").mappings is not tender_mapper.mappings
+    assert CSVMapper().mappings_df is tender_mapper.mappings_df
+
+
+def test_mapping_registry_reloads_changed_file(tmp_path):
+    mappings_file = str(tmp_path / "release_mappings.csv")
+    shutil.copy(settings.CSV_MAPPINGS_PATH, mappings_file)
+    os.utime(mappings_file, (1000000000, 1000000000))
+    registry = get_mapping_registry(mappings_file, "tender")
+    assert get_mapping_registry(mappings_file, "tender") is registry
+
+    with open(mappings_file, "a") as f:
+        f.write("tender/extra,Extra Field,,TRUE,,,,\n")
+    registry = get_mapping_registry(mappings_file, "tender")
+    assert registry.header_to_uri["Extra Field"] == "tender/extra"
+
+
+def test_mapping_registry_lookups():
+    mapper = CSVMapper(release_type="award")
+    mappings = mapper.mappings
+    simple_rows = [row for i, row in mapper.simple_mappings_df.iterrows()]
+
+    assert dict(mappings.header_to_uri) == {row["csv_header"]: row["uri"] for row in simple_rows if row["csv_header"]}
+    assert list(mappings.simple_uri_to_header.items()) == [(row["uri"], row["csv_header"]) for row in simple_rows]
+    assert list(mappings.simple_csv_headers) == [h for h in mapper.simple_csv_df["csv_header"].to_list() if h]
+    assert dict(mappings.uri_to_header) == {
+        row["uri"]: row["csv_header"] for i, row in mapper.mappings_df.iterrows() if row["csv_header"]
+    }
+    assert "Notice ID" in mappings.required_headers